@@ -1,14 +1,74 @@
-from typing import Dict, List, Optional
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-from ..models.trade import Trade, TradeStatus
-from .risk_metrics import RiskMetrics
+from ..models.trade import Trade
+from .fx import RateTable, balance_amounts, convert_frame, convert_positions, required_currencies
+from .group_by import group_stats
+from .parallel import parallel_broker_stats
+from .risk_metrics import RiskMetrics, fill_missing
+from .rollups import PnLRollups, rollup_timeline
+from .trade_frame import TradeFrame
+
+# Per-broker trade lists, or all of them already in one TradeFrame
+BrokerTrades = Union[Dict[str, List[Trade]], TradeFrame]
+
+# Rolling windows are a number of trades or a length of time
+Window = Union[int, timedelta]
+
+# Frames smaller than this are not worth shipping to a process pool
+PARALLEL_MIN_TRADES = 250000
+
+# Bound on the rows of all windows expanded at once for rolling drawdowns
+ROLLING_CHUNK_ROWS = 1 << 22
+
+
+def _window_sums(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Sum of values[lo:hi] for every window, from one cumulative sum."""
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    return totals[hi] - totals[lo]
+
+
+def _window_drawdowns(cumulative: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    Max drawdown of the equity curve inside every window, measured from the
+    window's own running peak as in RiskMetrics.calculate_max_drawdown.
+    Windows are expanded into one array (in bounded chunks) and the running
+    peak is a grouped cummax, so there is no Python loop over windows.
+    """
+    result = np.zeros(len(lo))
+    lengths = hi - lo
+    filled = np.flatnonzero(lengths > 0)
+    rows = np.cumsum(lengths[filled])
+    start = 0
+    while start < len(filled):
+        # Windows whose rows fit the chunk budget (at least one)
+        base = rows[start - 1] if start else 0
+        end = max(int(np.searchsorted(rows, base + ROLLING_CHUNK_ROWS, side='right')), start + 1)
+        windows = filled[start:end]
+        sizes = lengths[windows]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        index = np.arange(int(sizes.sum())) - np.repeat(offsets - lo[windows], sizes)
+        values = cumulative[index]
+        groups = np.repeat(np.arange(len(windows)), sizes)
+        peaks = pd.Series(values).groupby(groups).cummax().to_numpy()
+        result[windows] = np.maximum.reduceat(peaks - values, offsets)
+        start = end
+    return result
+
 
 class CrossBrokerAnalytics:
     """Aggregate and analyze data across multiple brokers."""
     
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None, parallel_min_trades: int = PARALLEL_MIN_TRADES):
+        """
+        ``executor`` (a process pool) runs per-broker metrics of frames with
+        at least ``parallel_min_trades`` trades concurrently.
+        """
         self.risk_calculator = RiskMetrics()
+        self.executor = executor
+        self.parallel_min_trades = parallel_min_trades
     
     def aggregate_trades(self, broker_trades: Dict[str, List[Trade]]) -> List[Trade]:
         """Combine trades from all brokers."""
@@ -17,52 +77,67 @@ class CrossBrokerAnalytics:
             all_trades.extend(trades)
         return all_trades
     
+    def to_frame(self, broker_trades: BrokerTrades) -> TradeFrame:
+        """Combine trades from all brokers into one TradeFrame."""
+        if isinstance(broker_trades, TradeFrame):
+            return broker_trades
+        return TradeFrame.from_broker_trades(broker_trades)
+    
     def calculate_consolidated_stats(
         self, 
-        broker_trades: Dict[str, List[Trade]],
+        broker_trades: BrokerTrades,
         broker_positions: Dict[str, List[Dict]],
-        broker_balances: Dict[str, Dict]
+        broker_balances: Dict[str, Dict],
+        rates: Optional[RateTable] = None
     ) -> Dict:
-        """Calculate consolidated statistics across all brokers."""
-        
-        all_trades = self.aggregate_trades(broker_trades)
+        """
+        Calculate consolidated statistics across all brokers. With ``rates``
+        balances, positions and trade PnL are converted to its base currency
+        first; amounts and trades in currencies it has no rate for are left
+        out, listed under ``unconverted_currencies`` and counted under
+        ``unconverted_trades``.
+        """
         
-        # Calculate total PnL
-        total_pnl = sum([t.pnl or 0 for t in all_trades if t.status == TradeStatus.CLOSED])
+        all_trades = self.to_frame(broker_trades)
+        if rates is not None:
+            missing = rates.missing(required_currencies(all_trades, broker_positions, broker_balances))
+            trade_count = len(all_trades)
+            all_trades = convert_frame(all_trades, rates, broker_balances)
         
-        # Calculate risk metrics
-        max_dd = self.risk_calculator.calculate_max_drawdown(all_trades)
-        win_rate_stats = self.risk_calculator.calculate_win_rate(all_trades)
-        sharpe = self.risk_calculator.calculate_sharpe_ratio(all_trades)
-        expectancy = self.risk_calculator.calculate_expectancy(all_trades)
-        var_95 = self.risk_calculator.calculate_var(all_trades, 0.95)
+        # PnL and risk metrics in one pass
+        metrics = self.risk_calculator.calculate_trade_metrics(all_trades, var_levels=(0.95,))
+        max_dd = metrics['max_drawdown']
+        win_rate_stats = metrics['win_rate_stats']
         
         # Aggregate positions
         all_positions = []
-        for positions in broker_positions.values():
+        risk_positions = []
+        for broker_id, positions in broker_positions.items():
             all_positions.extend(positions)
+            if rates is not None:
+                positions = convert_positions(positions, rates, broker_balances.get(broker_id, {}))
+            risk_positions.extend(positions)
         
-        open_risk = self.risk_calculator.calculate_open_risk(all_positions)
+        open_risk = self.risk_calculator.calculate_open_risk(risk_positions)
         
         # Calculate total balance
         total_balance = 0.0
         for balance in broker_balances.values():
-            if isinstance(balance, dict) and 'total' in balance:
-                # Sum all currency values (simplified - in reality you'd convert to base currency)
-                total_balance += sum(balance['total'].values())
+            amounts = balance_amounts(balance)
+            total_balance += rates.total(amounts) if rates is not None else sum(amounts.values())
         
-        return {
-            "total_pnl": total_pnl,
+        stats = {
+            "total_pnl": metrics['total_pnl'],
             "total_balance": total_balance,
-            "total_trades": len([t for t in all_trades if t.status == TradeStatus.CLOSED]),
+            "total_trades": metrics['total_trades'],
             "open_positions": len(all_positions),
             "win_rate": win_rate_stats['win_rate'],
             "profit_factor": win_rate_stats['profit_factor'],
-            "sharpe_ratio": sharpe,
-            "expectancy": expectancy,
+            "sharpe_ratio": metrics['sharpe_ratio'],
+            "expectancy": metrics['expectancy'],
             "max_drawdown": max_dd['max_drawdown'],
             "max_drawdown_percent": max_dd['max_drawdown_percent'],
-            "var_95": var_95,
+            "var_95": metrics['var_95'],
             "open_risk": open_risk['total_open_risk'],
             "unrealized_pnl": open_risk['total_unrealized_pnl'],
             "avg_win": win_rate_stats['avg_win'],
@@ -70,42 +145,53 @@ class CrossBrokerAnalytics:
             "winning_trades": win_rate_stats['winning_trades'],
             "losing_trades": win_rate_stats['losing_trades']
         }
+        if rates is not None:
+            stats["base_currency"] = rates.base
+            stats["unconverted_currencies"] = missing
+            stats["unconverted_trades"] = trade_count - len(all_trades)
+        return stats
     
     def compare_broker_performance(
         self, 
-        broker_trades: Dict[str, List[Trade]],
-        broker_balances: Dict[str, Dict]
+        broker_trades: BrokerTrades,
+        broker_balances: Dict[str, Dict],
+        rates: Optional[RateTable] = None
     ) -> List[Dict]:
-        """Compare performance metrics across brokers."""
+        """
+        Compare performance metrics across brokers, with PnL and balances in
+        the base currency of ``rates`` when given (trades without a rate are
+        left out).
+        """
         
+        all_trades = self.to_frame(broker_trades)
+        if rates is not None:
+            all_trades = convert_frame(all_trades, rates, broker_balances)
+        
+        # Every broker of the frame, in one grouped pass or one task per broker
+        if self.executor is not None and len(all_trades.brokers) > 1 and len(all_trades) >= self.parallel_min_trades:
+            groups = parallel_broker_stats(all_trades, self.executor)
+        else:
+            groups = group_stats(all_trades, 'broker', include_empty=True, risk=True)
         broker_stats = []
         
-        for broker_id, trades in broker_trades.items():
-            closed_trades = [t for t in trades if t.status == TradeStatus.CLOSED]
-            
-            total_pnl = sum([t.pnl or 0 for t in closed_trades])
-            win_rate_stats = self.risk_calculator.calculate_win_rate(trades)
-            max_dd = self.risk_calculator.calculate_max_drawdown(trades)
-            sharpe = self.risk_calculator.calculate_sharpe_ratio(trades)
+        for group in groups:
+            broker_id = group["key"]
             
             # Get balance for this broker
-            balance = 0.0
-            if broker_id in broker_balances:
-                broker_balance = broker_balances[broker_id]
-                if isinstance(broker_balance, dict) and 'total' in broker_balance:
-                    balance = sum(broker_balance['total'].values())
+            amounts = balance_amounts(broker_balances.get(broker_id, {}))
+            balance = rates.total(amounts) if rates is not None else float(sum(amounts.values()))
             
             broker_stats.append({
                 "broker_id": broker_id,
-                "total_pnl": total_pnl,
+                "total_pnl": group['total_pnl'],
                 "balance": balance,
-                "total_trades": len(closed_trades),
-                "win_rate": win_rate_stats['win_rate'],
-                "profit_factor": win_rate_stats['profit_factor'],
-                "sharpe_ratio": sharpe,
-                "max_drawdown_percent": max_dd['max_drawdown_percent'],
-                "avg_win": win_rate_stats['avg_win'],
-                "avg_loss": win_rate_stats['avg_loss']
+                "total_trades": group['total_trades'],
+                "win_rate": group['win_rate'],
+                "profit_factor": group['profit_factor'],
+                "sharpe_ratio": group['sharpe_ratio'],
+                "max_drawdown_percent": group['max_drawdown_percent'],
+                "avg_win": group['avg_win'],
+                "avg_loss": group['avg_loss']
             })
         
         # Sort by total PnL
@@ -115,83 +201,154 @@ class CrossBrokerAnalytics:
     
     def get_performance_timeline(
         self, 
-        broker_trades: Dict[str, List[Trade]],
-        period: str = "daily"
+        broker_trades: BrokerTrades,
+        period: str = "daily",
+        rollups: Optional[Sequence[PnLRollups]] = None,
+        broker_id: Optional[str] = None,
+        symbol: Optional[str] = None
     ) -> Dict:
-        """Get performance timeline aggregated by period (daily, weekly, monthly)."""
-        
-        all_trades = self.aggregate_trades(broker_trades)
-        closed_trades = [t for t in all_trades if t.status == TradeStatus.CLOSED and t.exit_time]
-        
-        if not closed_trades:
-            return {"dates": [], "cumulative_pnl": [], "daily_pnl": []}
-        
-        # Create DataFrame for easier time-based aggregation
-        df = pd.DataFrame([
-            {
-                "date": t.exit_time,
-                "pnl": t.pnl or 0,
-                "broker": t.broker_id
-            }
-            for t in closed_trades
-        ])
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        # Resample based on period
-        if period == "daily":
-            freq = 'D'
-        elif period == "weekly":
-            freq = 'W'
-        elif period == "monthly":
-            freq = 'M'
-        else:
-            freq = 'D'
-        
-        # Group by period and sum PnL
-        grouped = df.groupby(pd.Grouper(key='date', freq=freq))['pnl'].sum()
-        
-        # Calculate cumulative PnL
-        cumulative_pnl = grouped.cumsum()
-        
-        return {
-            "dates": [d.isoformat() for d in grouped.index],
-            "period_pnl": grouped.tolist(),
-            "cumulative_pnl": cumulative_pnl.tolist()
-        }
+        """
+        Get performance timeline aggregated by period (daily, weekly, monthly),
+        optionally for one broker and/or symbol. Reads prebuilt ``rollups``
+        (e.g. the poller's) when given, otherwise buckets the trades once.
+        """
+        if rollups is None:
+            rollups = [PnLRollups.from_frame(self.to_frame(broker_trades))]
+        return rollup_timeline(rollups, period, broker_id, symbol)
     
-    def get_symbol_performance(self, broker_trades: Dict[str, List[Trade]]) -> List[Dict]:
+    def get_rolling_metrics(
+        self,
+        broker_trades: BrokerTrades,
+        window: Window = 50,
+        step: Optional[Window] = None,
+        risk_free_rate: float = 0.02
+    ) -> Dict:
+        """
+        Rolling PnL, win rate, Sharpe ratio and max drawdown over closed
+        trades in exit order.
+
+        ``window`` is a number of trades or a timedelta. Count windows are
+        the last ``window`` trades, every ``step`` trades (default 1). Time
+        windows cover [end - window, end), with ends every ``step`` (default
+        one day) from the first exit time + window until past the last. All
+        windows are computed in one vectorized pass; each value matches the
+        batch metric of that window's trades.
+        """
+        all_trades = self.to_frame(broker_trades)
+        closed = all_trades.closed & ~np.isnat(all_trades.exit_time)
+        order = np.argsort(all_trades.exit_time[closed], kind='stable')
+        exit_times = all_trades.exit_time[closed][order]
+        pnl = all_trades.pnl[closed][order]
+        returns = all_trades.pnl_percent[closed][order]
+
+        lo, hi, ends = self._rolling_windows(exit_times, window, step)
+        result = {
+            "window": window if isinstance(window, int) else pd.Timedelta(window).isoformat(),
+            "step": step if step is None or isinstance(step, int) else pd.Timedelta(step).isoformat(),
+            "end_times": [],
+            "trades": [],
+            "pnl": [],
+            "win_rate": [],
+            "sharpe_ratio": [],
+            "max_drawdown": []
+        }
+        if not len(lo):
+            return result
+
+        filled_pnl = fill_missing(pnl)
+        valid = ~np.isnan(pnl)
+        decided = _window_sums(valid.astype(np.float64), lo, hi)
+        wins = _window_sums((filled_pnl > 0).astype(np.float64), lo, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(decided > 0, wins / decided * 100, 0.0)
+
+        # Population mean/std of returns per window, from shifted sums
+        has_return = ~np.isnan(returns)
+        shift = float(np.mean(returns[has_return])) if has_return.any() else 0.0
+        centered = np.where(has_return, returns - shift, 0.0)
+        count = _window_sums(has_return.astype(np.float64), lo, hi)
+        total = _window_sums(centered, lo, hi)
+        squares = _window_sums(centered * centered, lo, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+            variance = np.maximum(squares / count - mean * mean, 0.0)
+            std = np.sqrt(variance)
+            sharpe = (mean + shift - risk_free_rate) / std * np.sqrt(252)
+            # Same cases as the batch Sharpe: fewer than two returns or no spread
+            flat = variance <= 1e-12 * (squares / count)
+        sharpe = np.where((count >= 2) & ~flat, sharpe, 0.0)
+
+        result.update({
+            "end_times": np.datetime_as_string(ends).tolist(),
+            "trades": (hi - lo).tolist(),
+            "pnl": _window_sums(filled_pnl, lo, hi).tolist(),
+            "win_rate": win_rate.tolist(),
+            "sharpe_ratio": sharpe.tolist(),
+            "max_drawdown": _window_drawdowns(np.cumsum(filled_pnl), lo, hi).tolist()
+        })
+        return result
+
+    @staticmethod
+    def _rolling_windows(
+        exit_times: np.ndarray,
+        window: Window,
+        step: Optional[Window]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row bounds [lo, hi) and end time of every window over sorted exit times."""
+        empty = np.array([], dtype=np.intp)
+        if isinstance(window, int):
+            if step is None:
+                step = 1
+            if not isinstance(step, int) or window < 1 or step < 1:
+                raise ValueError("Count windows need a positive integer window and step")
+            hi = np.arange(window, len(exit_times) + 1, step, dtype=np.intp)
+            lo = hi - window
+            return lo, hi, exit_times[hi - 1] if len(hi) else exit_times[:0]
+
+        if step is None:
+            step = timedelta(days=1)
+        if not isinstance(step, timedelta) or window <= timedelta(0) or step <= timedelta(0):
+            raise ValueError("Time windows need a positive timedelta window and step")
+        if not len(exit_times):
+            return empty, empty, exit_times[:0]
+        length = np.timedelta64(window, 'us')
+        stride = np.timedelta64(step, 'us')
+        first_end = exit_times[0] + length
+        # Enough windows that the last one ends after the last exit
+        count = int((exit_times[-1] - first_end) // stride) + 2 if exit_times[-1] >= first_end else 1
+        ends = first_end + stride * np.arange(count)
+        lo = np.searchsorted(exit_times, ends - length, side='left')
+        hi = np.searchsorted(exit_times, ends, side='left')
+        return lo, hi, ends
+
+    def get_symbol_performance(self, broker_trades: BrokerTrades) -> List[Dict]:
         """Analyze performance by trading symbol."""
         
-        all_trades = self.aggregate_trades(broker_trades)
-        closed_trades = [t for t in all_trades if t.status == TradeStatus.CLOSED]
-        
-        # Group by symbol
-        symbol_stats = {}
-        for trade in closed_trades:
-            symbol = trade.symbol
-            if symbol not in symbol_stats:
-                symbol_stats[symbol] = []
-            symbol_stats[symbol].append(trade)
+        # Group by symbol, in order of first appearance
+        groups = group_stats(self.to_frame(broker_trades), 'symbol', order='appearance')
         
-        # Calculate stats for each symbol
-        results = []
-        for symbol, trades in symbol_stats.items():
-            total_pnl = sum([t.pnl or 0 for t in trades])
-            win_rate_stats = self.risk_calculator.calculate_win_rate(trades)
-            
-            results.append({
-                "symbol": symbol,
-                "total_pnl": total_pnl,
-                "total_trades": len(trades),
-                "win_rate": win_rate_stats['win_rate'],
-                "profit_factor": win_rate_stats['profit_factor'],
-                "avg_win": win_rate_stats['avg_win'],
-                "avg_loss": win_rate_stats['avg_loss']
-            })
+        results = [
+            {
+                "symbol": group["key"],
+                "total_pnl": group["total_pnl"],
+                "total_trades": group["total_trades"],
+                "win_rate": group["win_rate"],
+                "profit_factor": group["profit_factor"],
+                "avg_win": group["avg_win"],
+                "avg_loss": group["avg_loss"]
+            }
+            for group in groups
+        ]
         
         # Sort by total PnL
         results.sort(key=lambda x: x['total_pnl'], reverse=True)
         
         return results
+    
+    def get_breakdown(self, broker_trades: BrokerTrades, by: str = 'symbol', risk: bool = False) -> List[Dict]:
+        """
+        Closed-trade stats per symbol, broker, tag, entry weekday or entry
+        hour (``by``), in label order. ``risk`` adds each group's Sharpe
+        ratio and max drawdown. Raises ValueError for an unknown key.
+        """
+        return group_stats(self.to_frame(broker_trades), by, risk=risk)
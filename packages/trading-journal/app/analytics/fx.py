@@ -0,0 +1,161 @@
+"""
+Base-currency conversion of balances, positions and trade PnL
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+import numpy as np
+from .trade_frame import TradeFrame
+
+
+def balance_amounts(balance: Dict) -> Dict[str, float]:
+    """
+    Amount per currency of a broker balance: the ``total`` wallet, or
+    ``balance`` in the account ``currency`` for single-account balances.
+    """
+    if not isinstance(balance, dict):
+        return {}
+    if isinstance(balance.get('total'), dict):
+        return balance['total']
+    if 'balance' in balance and balance.get('currency'):
+        return {balance['currency']: balance['balance']}
+    return {}
+
+
+def quote_currency(symbol: str) -> Optional[str]:
+    """
+    Currency a symbol is priced in: the settle or quote currency of
+    "BTC/USDT:USDT" / "BTC/USDT", the last three letters of a six-letter
+    FX pair such as "EURUSD", or None when it cannot be told.
+    """
+    if ':' in symbol:
+        return symbol.rsplit(':', 1)[1]
+    if '/' in symbol:
+        return symbol.split('/', 1)[1]
+    if len(symbol) == 6 and symbol.isalpha() and symbol.isupper():
+        return symbol[3:]
+    return None
+
+
+def account_currency(balance: Dict) -> Optional[str]:
+    """The currency of a single-currency account (MT4/MT5 style), else None."""
+    amounts = balance_amounts(balance)
+    return next(iter(amounts)) if len(amounts) == 1 else None
+
+
+class RateTable:
+    """
+    Value of one unit of each currency in the base currency. Unknown
+    currencies have a NaN rate, so amounts in them drop out of totals and
+    are listed by ``missing``.
+    """
+
+    def __init__(self, base: str, rates: Dict[str, float], updated_at: Optional[datetime] = None):
+        self.base = base
+        self.rates = dict(rates)
+        self.rates[base] = 1.0
+        self.updated_at = updated_at or datetime.utcnow()
+
+    def rate(self, currency: Optional[str]) -> float:
+        if currency is None:
+            return 1.0
+        return self.rates.get(currency, np.nan)
+
+    def rates_for(self, currencies: Sequence[Optional[str]]) -> np.ndarray:
+        """Rate of every entry, looked up once per distinct currency."""
+        if not len(currencies):
+            return np.zeros(0)
+        distinct, inverse = np.unique(np.array([c or self.base for c in currencies], dtype=object), return_inverse=True)
+        return np.array([self.rate(c) for c in distinct], dtype=np.float64)[inverse]
+
+    def convert(self, currencies: Sequence[Optional[str]], amounts: Sequence[float]) -> np.ndarray:
+        """Amounts in the base currency; NaN where the rate is unknown."""
+        return np.asarray(amounts, dtype=np.float64) * self.rates_for(currencies)
+
+    def total(self, amounts: Dict[str, float]) -> float:
+        """Sum of per-currency amounts in the base currency, skipping unknown rates."""
+        converted = self.convert(list(amounts), list(amounts.values()))
+        return float(np.nansum(converted))
+
+    def missing(self, currencies: Iterable[Optional[str]]) -> List[str]:
+        return sorted({c for c in currencies if c is not None and np.isnan(self.rate(c))})
+
+    def to_dict(self) -> Dict:
+        return {"base": self.base, "rates": self.rates, "updated_at": self.updated_at.isoformat()}
+
+
+def pnl_currency(symbol: str, balance: Dict) -> Optional[str]:
+    """
+    Currency a broker reports a symbol's PnL in: the account currency of a
+    single-currency account, otherwise the symbol's quote currency. None
+    (taken as the base currency) when neither is known.
+    """
+    return account_currency(balance) or quote_currency(symbol)
+
+
+def _pair_codes(frame: TradeFrame) -> np.ndarray:
+    """Code of every row's (broker, symbol) pair."""
+    return frame.broker.astype(np.int64) * len(frame.symbols) + frame.symbol
+
+
+def _pair_currencies(frame: TradeFrame, broker_balances: Dict[str, Dict]) -> List[Optional[str]]:
+    """PnL currency of every (broker, symbol) pair, indexed by pair code."""
+    return [
+        pnl_currency(symbol, broker_balances.get(broker_id, {}))
+        for broker_id in frame.brokers for symbol in frame.symbols
+    ]
+
+
+def convert_frame(frame: TradeFrame, rates: RateTable, broker_balances: Dict[str, Dict]) -> TradeFrame:
+    """
+    The frame with PnL in the base currency. Trades whose currency has no
+    rate are left out, so they count towards no total. Rates are looked up
+    per (broker, symbol) pair, not per row.
+    """
+    pair_rates = rates.rates_for(_pair_currencies(frame, broker_balances))
+    if not len(frame) or np.all(pair_rates == 1.0):
+        return frame
+    row_rates = pair_rates[_pair_codes(frame)]
+    converted = frame.replace(pnl=frame.pnl * row_rates)
+    known = ~np.isnan(row_rates)
+    return converted if known.all() else converted.take(known)
+
+
+def convert_positions(positions: List[Dict], rates: RateTable, balance: Dict) -> List[Dict]:
+    """
+    Copies of one broker's positions with prices and unrealized PnL in the
+    base currency. Positions whose currency has no rate are left out.
+    """
+    if not positions:
+        return []
+    position_rates = rates.rates_for([pnl_currency(p.get('symbol', ''), balance) for p in positions])
+    converted = []
+    for position, rate in zip(positions, position_rates.tolist()):
+        if np.isnan(rate):
+            continue
+        if rate == 1.0:
+            converted.append(position)
+            continue
+        position = dict(position)
+        for key in ('entry_price', 'mark_price', 'current_price', 'unrealized_pnl', 'pnl'):
+            if position.get(key) is not None:
+                position[key] = position[key] * rate
+        converted.append(position)
+    return converted
+
+
+def required_currencies(
+    frame: TradeFrame,
+    broker_positions: Dict[str, List[Dict]],
+    broker_balances: Dict[str, Dict]
+) -> Set[str]:
+    """Every currency a balance, position or trade of the snapshot is in."""
+    currencies = set()
+    for balance in broker_balances.values():
+        currencies.update(balance_amounts(balance))
+    for broker_id, positions in broker_positions.items():
+        balance = broker_balances.get(broker_id, {})
+        currencies.update(pnl_currency(p.get('symbol', ''), balance) for p in positions)
+    pair_currencies = _pair_currencies(frame, broker_balances)
+    currencies.update(pair_currencies[code] for code in np.unique(_pair_codes(frame)).tolist())
+    currencies.discard(None)
+    return currencies
@@ -0,0 +1,160 @@
+"""
+Vectorized group-by over TradeFrame category codes
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+from .risk_metrics import fill_missing
+from .trade_frame import TradeFrame
+
+GROUP_KEYS = ('symbol', 'broker', 'tag', 'weekday', 'hour')
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def group_codes(frame: TradeFrame, key: str) -> Tuple[np.ndarray, np.ndarray, List]:
+    """
+    Row indices, group codes and group labels for a key. Weekday and hour
+    come from the entry time. A trade with several tags is in each tag's
+    group, so rows can repeat.
+    """
+    rows = np.arange(len(frame))
+    if key == 'symbol':
+        return rows, frame.symbol, list(frame.symbols)
+    if key == 'broker':
+        return rows, frame.broker, list(frame.brokers)
+    if key == 'tag':
+        return np.repeat(rows, np.diff(frame.tag_offsets)), frame.tag, list(frame.tags)
+    if key in ('weekday', 'hour'):
+        has_time = ~np.isnat(frame.entry_time)
+        rows = rows[has_time]
+        times = frame.entry_time[has_time]
+        if key == 'weekday':
+            # 1970-01-01 was a Thursday, so Monday is 0 in (days + 3) % 7
+            return rows, (times.astype('datetime64[D]').astype(np.int64) + 3) % 7, list(WEEKDAYS)
+        return rows, times.astype('datetime64[h]').astype(np.int64) % 24, list(range(24))
+    raise ValueError(f"Unknown group key '{key}', use one of: {', '.join(GROUP_KEYS)}")
+
+
+def _empty_stats() -> Dict:
+    return {
+        "total_pnl": 0,
+        "total_trades": 0,
+        "win_rate": 0.0,
+        "winning_trades": 0,
+        "losing_trades": 0,
+        "profit_factor": 0.0,
+        "avg_win": 0.0,
+        "avg_loss": 0.0
+    }
+
+
+def _group_drawdowns(frame: TradeFrame, rows: np.ndarray, codes: np.ndarray, groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Max drawdown and final peak of every group's closed-trade equity curve."""
+    has_exit = ~np.isnat(frame.exit_time[rows])
+    rows, codes = rows[has_exit], codes[has_exit]
+    max_dd = np.zeros(groups)
+    final_peak = np.zeros(groups)
+    if not len(rows):
+        return max_dd, final_peak
+
+    # Exit order within each group: stable sorts by exit time, then group
+    order = np.argsort(frame.exit_time[rows], kind='stable')
+    order = order[np.argsort(codes[order], kind='stable')]
+    codes = codes[order]
+    pnl = fill_missing(frame.pnl[rows][order])
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    for start, end in zip(np.r_[0, bounds].tolist(), np.r_[bounds, len(codes)].tolist()):
+        cumulative = np.cumsum(pnl[start:end])
+        peaks = np.maximum.accumulate(cumulative)
+        max_dd[codes[start]] = np.max(peaks - cumulative)
+        final_peak[codes[start]] = peaks[-1]
+    return max_dd, final_peak
+
+
+def group_stats(
+    frame: TradeFrame,
+    key: str,
+    order: str = 'label',
+    include_empty: bool = False,
+    risk: bool = False,
+    risk_free_rate: float = 0.02
+) -> List[Dict]:
+    """
+    PnL, trade count, win rate, profit factor and average win/loss of the
+    closed trades of every group, from a handful of bincounts over the
+    group codes instead of a pass per group. ``risk`` adds each group's
+    Sharpe ratio and max drawdown. The values match RiskMetrics run on the
+    group's trades, up to float rounding in the means.
+
+    Groups come in label order, or in order of first appearance among the
+    closed trades (``order='appearance'``). Groups without closed trades
+    are skipped unless ``include_empty``. Each result has the group label
+    under ``"key"``.
+    """
+    rows, codes, labels = group_codes(frame, key)
+    closed = frame.closed[rows]
+    rows = rows[closed]
+    codes = codes[closed].astype(np.intp)
+    groups = len(labels)
+
+    def count(mask: np.ndarray) -> np.ndarray:
+        return np.bincount(codes[mask], minlength=groups)
+
+    def total(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+        return np.bincount(codes[mask], weights=values[mask], minlength=groups)
+
+    pnl = frame.pnl[rows]
+    valid = ~np.isnan(pnl)
+    wins = valid & (pnl > 0)
+    losses = valid & (pnl < 0)
+    every = np.ones(len(rows), dtype=bool)
+    trades = count(every)
+    decided = count(valid)
+    win_count = count(wins)
+    loss_count = count(losses)
+    # bincount adds in row order, like the sequential sums of the batch code
+    pnl_total = total(every, fill_missing(pnl))
+    win_total = total(wins, pnl)
+    loss_total = total(losses, np.abs(pnl))
+
+    if risk:
+        returns = frame.pnl_percent[rows]
+        has_return = ~np.isnan(returns)
+        return_count = count(has_return)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total(has_return, returns) / return_count
+            variance = total(has_return, (returns - mean[codes]) ** 2) / return_count
+            sharpe = (mean - risk_free_rate) / np.sqrt(variance) * np.sqrt(252)
+        sharpe = np.where((return_count >= 2) & (variance > 0), sharpe, 0.0)
+        max_dd, final_peak = _group_drawdowns(frame, rows, codes, groups)
+
+    present = np.arange(groups) if include_empty else np.flatnonzero(trades)
+    if order == 'appearance':
+        first = np.full(groups, len(codes))
+        np.minimum.at(first, codes, np.arange(len(codes)))
+        present = present[np.argsort(first[present], kind='stable')]
+
+    results = []
+    for g in present.tolist():
+        stats = _empty_stats()
+        if trades[g]:
+            stats["total_pnl"] = float(pnl_total[g])
+            stats["total_trades"] = int(trades[g])
+        if decided[g]:
+            stats.update({
+                "win_rate": (win_count[g] / decided[g]) * 100,
+                "winning_trades": int(win_count[g]),
+                "losing_trades": int(loss_count[g]),
+                "profit_factor": win_total[g] / loss_total[g] if loss_total[g] > 0 else 0,
+                "avg_win": win_total[g] / win_count[g] if win_count[g] else 0,
+                "avg_loss": loss_total[g] / loss_count[g] if loss_count[g] else 0
+            })
+        if risk:
+            drawdown = float(max_dd[g]) if max_dd[g] > 0 else 0
+            stats.update({
+                "sharpe_ratio": float(sharpe[g]),
+                "max_drawdown": drawdown,
+                "max_drawdown_percent": drawdown / float(final_peak[g]) * 100 if final_peak[g] > 0 else 0
+            })
+        results.append({"key": labels[g], **stats})
+    return results
@@ -0,0 +1,141 @@
+"""
+Bootstrap Monte Carlo simulation of equity paths
+"""
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Bound on the path x trade cells simulated in one chunk (one task of a pool)
+SIMULATION_CHUNK_CELLS = 1 << 20
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+ChunkResult = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _chunk_sizes(paths: int, horizon: int) -> List[int]:
+    """Paths per chunk. Depends only on the path count and horizon, never on
+    the workers, so a seed gives the same result with or without a pool."""
+    per_chunk = max(1, SIMULATION_CHUNK_CELLS // horizon)
+    return [min(per_chunk, paths - start) for start in range(0, paths, per_chunk)]
+
+
+def _simulate_chunk(
+    pnl: np.ndarray,
+    paths: int,
+    horizon: int,
+    block_size: int,
+    seed: np.random.SeedSequence,
+    ruin_level: float
+) -> ChunkResult:
+    """
+    Final PnL, max drawdown and whether the ruin level was hit, for
+    ``paths`` resampled equity paths of ``horizon`` trades each. Every path
+    is a row of one matrix, so the whole chunk is a few array operations.
+    """
+    rng = np.random.default_rng(seed)
+    if block_size == 1:
+        index = rng.integers(0, len(pnl), size=(paths, horizon), dtype=np.int32)
+    else:
+        # Moving blocks of consecutive trades (wrapping around the end)
+        blocks = -(-horizon // block_size)
+        starts = rng.integers(0, len(pnl), size=(paths, blocks, 1), dtype=np.int32)
+        index = ((starts + np.arange(block_size)) % len(pnl)).reshape(paths, -1)[:, :horizon]
+
+    cumulative = pnl[index]
+    del index
+    np.cumsum(cumulative, axis=1, out=cumulative)
+    # Equity starts at zero, so the running peak never drops below it
+    peaks = np.maximum.accumulate(cumulative, axis=1)
+    np.maximum(peaks, 0.0, out=peaks)
+    ruined = cumulative.min(axis=1) <= -ruin_level
+    final = cumulative[:, -1].copy()
+    np.subtract(peaks, cumulative, out=peaks)
+    return final, peaks.max(axis=1), ruined
+
+
+def _distribution(values: np.ndarray) -> Dict:
+    return {
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "percentiles": dict(zip(map(str, PERCENTILES), np.percentile(values, PERCENTILES).tolist()))
+    }
+
+
+def simulate_equity_paths(
+    pnl: np.ndarray,
+    paths: int = 10000,
+    horizon: Optional[int] = None,
+    block_size: int = 1,
+    seed: Optional[int] = None,
+    capital: Optional[float] = None,
+    ruin_fraction: float = 0.5,
+    confidence_levels: Sequence[float] = (0.95, 0.99),
+    executor: Optional[Executor] = None
+) -> Dict:
+    """
+    Bootstrap ``paths`` equity paths of ``horizon`` trades (default: as many
+    as the history) by resampling per-trade PnL with replacement, one trade
+    at a time or in moving blocks of ``block_size`` consecutive trades to
+    keep streaks (a block is at most ``horizon`` trades). Reports the
+    distribution of final PnL and max drawdown, VaR/CVaR of the final PnL
+    at each confidence level and, given ``capital``, the risk of ruin: the
+    share of paths whose equity falls ``ruin_fraction`` of the capital
+    below the start.
+
+    Paths are simulated in chunks of at most SIMULATION_CHUNK_CELLS cells,
+    each from its own child of one SeedSequence; chunks run on ``executor``
+    (e.g. a process pool) when there are several. The same ``seed`` always
+    gives the same result. Without one a seed is drawn and returned.
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    pnl = pnl[~np.isnan(pnl)]
+    if paths < 1:
+        raise ValueError("paths must be at least 1")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    horizon = horizon or len(pnl)
+    # A block longer than the path adds nothing but index memory
+    block_size = max(1, min(block_size, horizon))
+    if seed is None:
+        # 63 bits, so the returned seed fits a signed 64-bit integer
+        seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> 1)
+
+    result = {
+        "paths": paths,
+        "horizon": horizon,
+        "block_size": block_size,
+        "seed": seed,
+        "trades": len(pnl)
+    }
+    if not len(pnl) or horizon < 1:
+        result.update({"final_pnl": None, "max_drawdown": None, "risk_of_ruin": None})
+        for level in confidence_levels:
+            result[f"var_{round(level * 100)}"] = 0.0
+            result[f"cvar_{round(level * 100)}"] = 0.0
+        return result
+
+    sizes = _chunk_sizes(paths, horizon)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ruin_level = capital * ruin_fraction if capital is not None else np.inf
+    args = (
+        [pnl] * len(sizes), sizes, [horizon] * len(sizes),
+        [block_size] * len(sizes), seeds, [ruin_level] * len(sizes)
+    )
+    if executor is not None and len(sizes) > 1:
+        chunks = list(executor.map(_simulate_chunk, *args))
+    else:
+        chunks = [_simulate_chunk(*chunk) for chunk in zip(*args)]
+    final, max_dd, ruined = (np.concatenate(column) for column in zip(*chunks))
+
+    result.update({
+        "final_pnl": _distribution(final),
+        "max_drawdown": _distribution(max_dd),
+        "risk_of_ruin": float(np.mean(ruined)) if capital is not None else None
+    })
+    for level in confidence_levels:
+        # VaR is the loss at the tail percentile, CVaR the mean loss beyond it
+        cutoff = np.percentile(final, (1 - level) * 100)
+        result[f"var_{round(level * 100)}"] = abs(float(cutoff))
+        result[f"cvar_{round(level * 100)}"] = abs(float(np.mean(final[final <= cutoff])))
+    return result
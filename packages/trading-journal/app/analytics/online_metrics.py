@@ -0,0 +1,373 @@
+"""
+Streaming risk-metric accumulators, updated in O(1) per closed trade
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from .trade_frame import TradeFrame
+
+
+def _time_to_str(value: Optional[np.datetime64]) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _time_from_str(value: Optional[str]) -> Optional[np.datetime64]:
+    return None if value is None else np.datetime64(value, 'us')
+
+
+class RunningMoments:
+    """Welford's running mean and (population) variance."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, like np.std."""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'RunningMoments':
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = state['count'], state['mean'], state['m2']
+        return moments
+
+
+class RunningDrawdown:
+    """
+    Running peak and deepest drawdown of cumulative PnL. Trades must be
+    added in exit-time order.
+    """
+
+    def __init__(self):
+        self.cumulative = 0.0
+        self.peak: Optional[float] = None
+        self.peak_time: Optional[np.datetime64] = None
+        self.last_time: Optional[np.datetime64] = None
+        self.max_drawdown = 0.0
+        self.drawdown_start: Optional[np.datetime64] = None
+        self.drawdown_end: Optional[np.datetime64] = None
+
+    def add(self, pnl: float, exit_time: np.datetime64) -> None:
+        self.cumulative += pnl
+        self.last_time = exit_time
+        # The last time the peak was reached, as in the batch calculation
+        if self.peak is None or self.cumulative >= self.peak:
+            self.peak = self.cumulative
+            self.peak_time = exit_time
+        drawdown = self.peak - self.cumulative
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+            self.drawdown_start = self.peak_time
+            self.drawdown_end = exit_time
+
+    def result(self) -> Dict[str, float]:
+        """Same fields as RiskMetrics.calculate_max_drawdown."""
+        max_dd_percent = 0
+        if self.peak is not None and self.peak > 0:
+            max_dd_percent = (self.max_drawdown / self.peak) * 100
+        duration_days = 0
+        if self.drawdown_end is not None:
+            duration_days = int((self.drawdown_end - self.drawdown_start) // np.timedelta64(1, 'D'))
+        return {
+            "max_drawdown": float(self.max_drawdown),
+            "max_drawdown_percent": max_dd_percent,
+            "duration_days": duration_days
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'cumulative': self.cumulative,
+            'peak': self.peak,
+            'peak_time': _time_to_str(self.peak_time),
+            'last_time': _time_to_str(self.last_time),
+            'max_drawdown': self.max_drawdown,
+            'drawdown_start': _time_to_str(self.drawdown_start),
+            'drawdown_end': _time_to_str(self.drawdown_end)
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'RunningDrawdown':
+        drawdown = cls()
+        drawdown.cumulative = state['cumulative']
+        drawdown.peak = state['peak']
+        drawdown.peak_time = _time_from_str(state['peak_time'])
+        drawdown.last_time = _time_from_str(state['last_time'])
+        drawdown.max_drawdown = state['max_drawdown']
+        drawdown.drawdown_start = _time_from_str(state['drawdown_start'])
+        drawdown.drawdown_end = _time_from_str(state['drawdown_end'])
+        return drawdown
+
+
+class WinLossTotals:
+    """Running win/loss counts and sums."""
+
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.losses = 0
+        self.win_sum = 0.0
+        self.loss_sum = 0.0
+
+    def add(self, pnl: float) -> None:
+        self.count += 1
+        if pnl > 0:
+            self.wins += 1
+            self.win_sum += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.loss_sum += pnl
+
+    def result(self) -> Dict[str, float]:
+        """Same fields as RiskMetrics.calculate_win_rate."""
+        if not self.count:
+            return {
+                "win_rate": 0.0,
+                "total_trades": 0,
+                "winning_trades": 0,
+                "losing_trades": 0,
+                "avg_win": 0.0,
+                "avg_loss": 0.0,
+                "profit_factor": 0.0
+            }
+        total_losses = abs(self.loss_sum)
+        return {
+            "win_rate": (self.wins / self.count) * 100,
+            "total_trades": self.count,
+            "winning_trades": self.wins,
+            "losing_trades": self.losses,
+            "avg_win": self.win_sum / self.wins if self.wins else 0,
+            "avg_loss": total_losses / self.losses if self.losses else 0,
+            "profit_factor": self.win_sum / total_losses if total_losses > 0 else 0
+        }
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'WinLossTotals':
+        totals = cls()
+        vars(totals).update(state)
+        return totals
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P-square algorithm (Jain and
+    Chlamtac, 1985): five markers, constant memory and time per value.
+
+    The first ``exact_size`` values are kept and give exact percentiles.
+    The markers are then seeded from them, which keeps low quantiles such
+    as VaR's 1% and 5% stable early on.
+    """
+
+    def __init__(self, quantile: float, exact_size: int = 256):
+        self.quantile = quantile
+        self.exact_size = exact_size
+        self.count = 0
+        self.buffer: Optional[List[float]] = []
+        self.heights: List[float] = []
+        self.positions: List[int] = []
+        self.desired: List[float] = []
+        p = quantile
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def _seed(self) -> None:
+        values = sorted(self.buffer)
+        last = len(values) - 1
+        positions = []
+        for i, increment in enumerate(self.increments):
+            position = int(round(last * increment))
+            if positions:
+                position = max(position, positions[-1] + 1)
+            positions.append(min(position, last - (4 - i)))
+        self.positions = positions
+        self.heights = [values[n] for n in positions]
+        self.desired = [last * increment for increment in self.increments]
+        self.buffer = None
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if self.buffer is not None:
+            self.buffer.append(value)
+            if len(self.buffer) >= max(self.exact_size, 5):
+                self._seed()
+            return
+
+        q, n = self.heights, self.positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= value < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = self._linear(i, d)
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        if self.buffer is not None:
+            return float(np.percentile(self.buffer, self.quantile * 100)) if self.buffer else 0.0
+        return self.heights[2]
+
+    def to_dict(self) -> Dict:
+        return {
+            'quantile': self.quantile,
+            'exact_size': self.exact_size,
+            'count': self.count,
+            'buffer': self.buffer,
+            'heights': self.heights,
+            'positions': self.positions,
+            'desired': self.desired
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'P2Quantile':
+        estimator = cls(state['quantile'], state['exact_size'])
+        estimator.count = state['count']
+        estimator.buffer = state['buffer']
+        estimator.heights = state['heights']
+        estimator.positions = state['positions']
+        estimator.desired = state['desired']
+        return estimator
+
+
+class OnlineRiskMetrics:
+    """
+    Incremental counterpart of RiskMetrics.calculate_trade_metrics.
+
+    Feed closed trades once each, in exit-time order, with ``add`` or
+    ``add_frame``. Every update is O(1) and ``metrics()`` reads the current
+    values without touching the history. Win/loss stats, expectancy, Sharpe
+    and drawdown match the batch results up to float rounding. VaR is a
+    P-square estimate once more than ``exact_size`` trades have been seen.
+    ``to_dict``/``from_dict`` checkpoint the state as plain JSON types.
+    """
+
+    def __init__(self, var_levels: Sequence[float] = (0.95, 0.99), risk_free_rate: float = 0.02):
+        self.var_levels = tuple(var_levels)
+        self.risk_free_rate = risk_free_rate
+        self.total_pnl = 0.0
+        self.total_trades = 0
+        self.returns = RunningMoments()
+        self.drawdown = RunningDrawdown()
+        self.win_loss = WinLossTotals()
+        self.var = [P2Quantile(1 - level) for level in self.var_levels]
+
+    @property
+    def last_exit_time(self) -> Optional[np.datetime64]:
+        return self.drawdown.last_time
+
+    def in_order(self, exit_time: Optional[np.datetime64]) -> bool:
+        """False if a trade with this exit time can no longer be added in order."""
+        if exit_time is None or self.last_exit_time is None:
+            return True
+        return exit_time >= self.last_exit_time
+
+    def add(self, pnl: float, pnl_percent: float, exit_time: Optional[np.datetime64]) -> None:
+        """Add one closed trade. Missing values are NaN / None, as in a TradeFrame."""
+        self.total_trades += 1
+        if not math.isnan(pnl):
+            self.total_pnl += pnl
+            self.win_loss.add(pnl)
+            for estimator in self.var:
+                estimator.add(pnl)
+        if not math.isnan(pnl_percent):
+            self.returns.add(pnl_percent)
+        if exit_time is not None:
+            self.drawdown.add(0.0 if math.isnan(pnl) else pnl, exit_time)
+
+    def add_frame(self, frame: TradeFrame, rows: Optional[np.ndarray] = None) -> None:
+        """Add the closed trades of a frame (or of the given rows), sorted by exit time."""
+        rows = np.flatnonzero(frame.closed) if rows is None else rows[frame.closed[rows]]
+        rows = rows[np.argsort(frame.exit_time[rows], kind='stable')]
+        for pnl, pnl_percent, exit_time in zip(
+            frame.pnl[rows].tolist(), frame.pnl_percent[rows].tolist(), frame.exit_time[rows]
+        ):
+            self.add(pnl, pnl_percent, None if np.isnat(exit_time) else exit_time)
+
+    def sharpe_ratio(self) -> float:
+        if self.returns.count < 2 or self.returns.m2 == 0:
+            return 0.0
+        # Annualized Sharpe ratio (assuming daily returns)
+        return (self.returns.mean - self.risk_free_rate) / self.returns.std * math.sqrt(252)
+
+    def metrics(self) -> Dict:
+        """Current values, in the shape of RiskMetrics.calculate_trade_metrics."""
+        win_rate_stats = self.win_loss.result()
+        expectancy = 0.0
+        if win_rate_stats['total_trades']:
+            win_rate = win_rate_stats['win_rate'] / 100
+            expectancy = (win_rate * win_rate_stats['avg_win']) - ((1 - win_rate) * win_rate_stats['avg_loss'])
+
+        metrics = {
+            "total_pnl": self.total_pnl,
+            "total_trades": self.total_trades,
+            "max_drawdown": self.drawdown.result(),
+            "win_rate_stats": win_rate_stats,
+            "sharpe_ratio": self.sharpe_ratio(),
+            "expectancy": expectancy
+        }
+        for level, estimator in zip(self.var_levels, self.var):
+            metrics[f"var_{round(level * 100)}"] = abs(estimator.value)
+        return metrics
+
+    def to_dict(self) -> Dict:
+        return {
+            'var_levels': list(self.var_levels),
+            'risk_free_rate': self.risk_free_rate,
+            'total_pnl': self.total_pnl,
+            'total_trades': self.total_trades,
+            'returns': self.returns.to_dict(),
+            'drawdown': self.drawdown.to_dict(),
+            'win_loss': self.win_loss.to_dict(),
+            'var': [estimator.to_dict() for estimator in self.var]
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'OnlineRiskMetrics':
+        online = cls(state['var_levels'], state['risk_free_rate'])
+        online.total_pnl = state['total_pnl']
+        online.total_trades = state['total_trades']
+        online.returns = RunningMoments.from_dict(state['returns'])
+        online.drawdown = RunningDrawdown.from_dict(state['drawdown'])
+        online.win_loss = WinLossTotals.from_dict(state['win_loss'])
+        online.var = [P2Quantile.from_dict(s) for s in state['var']]
+        return online
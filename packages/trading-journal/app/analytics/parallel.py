@@ -0,0 +1,111 @@
+"""
+Per-broker analytics on a process pool, with TradeFrame columns in shared memory
+"""
+from concurrent.futures import Executor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+import numpy as np
+from .group_by import group_stats
+from .trade_frame import TradeFrame
+
+# Columns copied to shared memory; the category lists travel with each task
+COLUMNS = (
+    'pnl', 'pnl_percent', 'quantity', 'entry_time', 'exit_time',
+    'status', 'symbol', 'broker', 'tag', 'tag_offsets'
+)
+
+# (column, offset, dtype, length) of every column in the block
+Layout = List[Tuple[str, int, str, int]]
+
+
+def _views(buffer, layout: Layout) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray((length,), dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        for name, offset, dtype, length in layout
+    }
+
+
+class SharedFrame:
+    """
+    A TradeFrame's columns copied once into one shared memory block. Worker
+    processes attach by name and read the columns in place, so a task only
+    pickles the block name, the layout and the category lists. Use as a
+    context manager; the block is unlinked on exit.
+    """
+
+    def __init__(self, frame: TradeFrame):
+        self.layout: Layout = []
+        offset = 0
+        for name in COLUMNS:
+            column = getattr(frame, name)
+            self.layout.append((name, offset, column.dtype.str, len(column)))
+            # Keep every column 8-byte aligned
+            offset += -(-column.nbytes // 8) * 8
+        self.shm = SharedMemory(create=True, size=max(offset, 1))
+        views = _views(self.shm.buf, self.layout)
+        for name, view in views.items():
+            view[:] = getattr(frame, name)
+        del views
+        self.categories = (frame.symbols, frame.brokers, frame.tags)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> 'SharedFrame':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _broker_stats(
+    name: str,
+    layout: Layout,
+    categories: Tuple[List[str], List[str], List[str]],
+    code: int,
+    start: int,
+    end: int,
+    risk_free_rate: float
+) -> Dict:
+    """Stats of one broker's rows (start:end) of a shared frame, run in a worker."""
+    # Pool workers share the parent's resource tracker, which unlinks the
+    # block only when the parent does
+    shm = SharedMemory(name=name)
+    symbols, brokers, tags = categories
+    frame = TradeFrame(**_views(shm.buf, layout), symbols=symbols, brokers=brokers, tags=tags)
+    groups = group_stats(frame.rows(start, end), 'broker', include_empty=True, risk=True, risk_free_rate=risk_free_rate)
+    # The views must be gone before the block can be closed (on errors the
+    # traceback holds them and the block is closed when it is collected)
+    del frame
+    shm.close()
+    return groups[code]
+
+
+def parallel_broker_stats(frame: TradeFrame, executor: Executor, risk_free_rate: float = 0.02) -> List[Dict]:
+    """
+    The per-broker group_stats(frame, 'broker', include_empty=True,
+    risk=True) computed concurrently, one task per broker, on ``executor``
+    (a process pool). The frame is ordered by broker if it is not already,
+    copied into shared memory once, and the results are merged back in
+    broker order.
+    """
+    if len(frame) and np.any(np.diff(frame.broker) < 0):
+        frame = frame.take(np.argsort(frame.broker, kind='stable'))
+    bounds = np.searchsorted(frame.broker, np.arange(len(frame.brokers) + 1)).tolist()
+
+    with SharedFrame(frame) as shared:
+        tasks = [
+            executor.submit(
+                _broker_stats, shared.name, shared.layout, shared.categories,
+                code, bounds[code], bounds[code + 1], risk_free_rate
+            )
+            for code in range(len(frame.brokers))
+        ]
+        # Every task must be done with the block before it is unlinked
+        wait(tasks)
+        return [task.result() for task in tasks]
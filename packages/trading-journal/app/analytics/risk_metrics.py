@@ -1,79 +1,137 @@
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
-from ..models.trade import Trade, TradeStatus
+from .monte_carlo import simulate_equity_paths
+from .trade_frame import TradeData, TradeFrame, as_frame
+
+
+def fill_missing(values: np.ndarray) -> np.ndarray:
+    """Missing PnL counts as zero."""
+    return np.where(np.isnan(values), 0.0, values)
+
+
+def running_sum(values: np.ndarray) -> float:
+    """Left-to-right sum, equal to Python's sum() on the same values."""
+    return float(np.cumsum(values)[-1]) if len(values) else 0
+
+# Fields of calculate_max_drawdown, a subset of the drawdown profile
+MAX_DRAWDOWN_KEYS = ("max_drawdown", "max_drawdown_percent", "duration_days")
+
 
 class RiskMetrics:
     """Calculate comprehensive risk metrics for trading accounts."""
     
     @staticmethod
-    def calculate_max_drawdown(trades: List[Trade]) -> Dict[str, float]:
-        """Calculate maximum drawdown from trade history."""
-        if not trades:
-            return {"max_drawdown": 0.0, "max_drawdown_percent": 0.0, "duration_days": 0}
-        
-        # Sort trades by exit time
-        closed_trades = [t for t in trades if t.status == TradeStatus.CLOSED and t.exit_time]
-        closed_trades.sort(key=lambda x: x.exit_time)
-        
-        if not closed_trades:
-            return {"max_drawdown": 0.0, "max_drawdown_percent": 0.0, "duration_days": 0}
-        
-        # Calculate cumulative PnL
-        cumulative_pnl = []
-        running_pnl = 0
-        for trade in closed_trades:
-            running_pnl += trade.pnl or 0
-            cumulative_pnl.append(running_pnl)
-        
-        # Find maximum drawdown
-        peak = cumulative_pnl[0]
+    def _equity_curve(frame: TradeFrame, closed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Exit times and cumulative PnL of closed trades, in exit order."""
+        if closed is None:
+            closed = frame.closed
+        closed = closed & ~np.isnat(frame.exit_time)
+        order = np.argsort(frame.exit_time[closed], kind='stable')
+        return frame.exit_time[closed][order], np.cumsum(fill_missing(frame.pnl[closed][order]))
+
+    @staticmethod
+    def calculate_drawdown_profile(trades: TradeData, include_underwater: bool = True) -> Dict:
+        """
+        Maximum drawdown of the closed-trade equity curve with its peak,
+        trough and recovery (indices into the curve and times), plus the
+        underwater curve: how far below its running peak the equity is after
+        each trade. One linear pass over cumsum / maximum.accumulate.
+        Recovery fields are None while the drawdown is not recovered.
+        Pass ``include_underwater=False`` to skip building the curve.
+        """
+        exit_times, cumulative_pnl = RiskMetrics._equity_curve(as_frame(trades))
+        return RiskMetrics._drawdown(exit_times, cumulative_pnl, include_underwater)
+
+    @staticmethod
+    def _drawdown(exit_times: np.ndarray, cumulative_pnl: np.ndarray, include_underwater: bool) -> Dict:
+        if not len(exit_times):
+            profile = {
+                "max_drawdown": 0.0, "max_drawdown_percent": 0.0, "duration_days": 0,
+                "peak_index": None, "trough_index": None, "recovery_index": None,
+                "peak_time": None, "trough_time": None, "recovery_time": None,
+                "recovery_days": None
+            }
+            if include_underwater:
+                profile["underwater"] = {"times": [], "drawdown": [], "drawdown_percent": []}
+            return profile
+
+        # Drawdown below the running peak after every trade
+        peaks = np.maximum.accumulate(cumulative_pnl)
+        underwater = cumulative_pnl - peaks
+        trough_idx = int(np.argmin(underwater))
         max_dd = 0
         max_dd_percent = 0
-        dd_start_idx = 0
-        dd_end_idx = 0
-        
-        for i, pnl in enumerate(cumulative_pnl):
-            if pnl > peak:
-                peak = pnl
-            dd = peak - pnl
-            if dd > max_dd:
-                max_dd = dd
-                dd_end_idx = i
-                # Find the peak before this drawdown
-                for j in range(i, -1, -1):
-                    if cumulative_pnl[j] == peak:
-                        dd_start_idx = j
-                        break
-        
+        peak_idx = 0
+        recovery_idx = None
+
+        if underwater[trough_idx] < 0:
+            max_dd = float(-underwater[trough_idx])
+            # The last time the peak was reached before this drawdown
+            at_peak = np.flatnonzero(cumulative_pnl[:trough_idx + 1] == peaks[trough_idx])
+            peak_idx = int(at_peak[-1])
+            # The first trade that brings equity back to that peak
+            recovered = np.flatnonzero(cumulative_pnl[trough_idx:] >= peaks[trough_idx])
+            if len(recovered):
+                recovery_idx = trough_idx + int(recovered[0])
+        else:
+            trough_idx = 0
+
         # Calculate drawdown percentage
+        peak = float(peaks[-1])
         if peak > 0:
             max_dd_percent = (max_dd / peak) * 100
-        
-        # Calculate duration
-        duration_days = 0
-        if dd_start_idx < len(closed_trades) and dd_end_idx < len(closed_trades):
-            start_time = closed_trades[dd_start_idx].exit_time
-            end_time = closed_trades[dd_end_idx].exit_time
-            if start_time and end_time:
-                duration_days = (end_time - start_time).days
-        
-        return {
+
+        def days(start: int, end: int) -> int:
+            return int((exit_times[end] - exit_times[start]) // np.timedelta64(1, 'D'))
+
+        def iso(index: Optional[int]) -> Optional[str]:
+            return None if index is None else exit_times[index].item().isoformat()
+
+        profile = {
             "max_drawdown": max_dd,
             "max_drawdown_percent": max_dd_percent,
-            "duration_days": duration_days
+            "duration_days": days(peak_idx, trough_idx),
+            "peak_index": peak_idx,
+            "trough_index": trough_idx,
+            "recovery_index": recovery_idx,
+            "peak_time": iso(peak_idx),
+            "trough_time": iso(trough_idx),
+            "recovery_time": iso(recovery_idx),
+            "recovery_days": None if recovery_idx is None else days(trough_idx, recovery_idx)
         }
+        if include_underwater:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                underwater_percent = np.where(peaks > 0, underwater / peaks * 100, 0.0)
+            profile["underwater"] = {
+                "times": np.datetime_as_string(exit_times).tolist(),
+                "drawdown": underwater.tolist(),
+                "drawdown_percent": underwater_percent.tolist()
+            }
+        return profile
+
+    @staticmethod
+    def calculate_max_drawdown(trades: TradeData) -> Dict[str, float]:
+        """Calculate maximum drawdown from trade history."""
+        profile = RiskMetrics.calculate_drawdown_profile(trades, include_underwater=False)
+        return {key: profile[key] for key in MAX_DRAWDOWN_KEYS}
     
     @staticmethod
-    def calculate_sharpe_ratio(trades: List[Trade], risk_free_rate: float = 0.02) -> float:
-        """Calculate Sharpe ratio from trade returns."""
-        if not trades:
-            return 0.0
-        
-        returns = [t.pnl_percent or 0 for t in trades if t.status == TradeStatus.CLOSED and t.pnl_percent is not None]
-        
-        if not returns or len(returns) < 2:
+    def _realized_pnl(frame: TradeFrame, closed: np.ndarray) -> np.ndarray:
+        """PnL of closed trades that have one."""
+        pnl = frame.pnl[closed]
+        return pnl[~np.isnan(pnl)]
+
+    @staticmethod
+    def _returns(frame: TradeFrame, closed: np.ndarray) -> np.ndarray:
+        """Percent returns of closed trades that have one."""
+        returns = frame.pnl_percent[closed]
+        return returns[~np.isnan(returns)]
+
+    @staticmethod
+    def _sharpe(returns: np.ndarray, risk_free_rate: float) -> float:
+        if len(returns) < 2:
             return 0.0
         
         mean_return = np.mean(returns)
@@ -85,13 +143,10 @@ class RiskMetrics:
         # Annualized Sharpe ratio (assuming daily returns)
         sharpe = (mean_return - risk_free_rate) / std_return * np.sqrt(252)
         return sharpe
-    
+
     @staticmethod
-    def calculate_win_rate(trades: List[Trade]) -> Dict[str, float]:
-        """Calculate win rate and related statistics."""
-        closed_trades = [t for t in trades if t.status == TradeStatus.CLOSED and t.pnl is not None]
-        
-        if not closed_trades:
+    def _win_rate(pnl: np.ndarray) -> Dict[str, float]:
+        if not len(pnl):
             return {
                 "win_rate": 0.0,
                 "total_trades": 0,
@@ -102,26 +157,87 @@ class RiskMetrics:
                 "profit_factor": 0.0
             }
         
-        winning_trades = [t for t in closed_trades if t.pnl > 0]
-        losing_trades = [t for t in closed_trades if t.pnl < 0]
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
         
-        win_rate = (len(winning_trades) / len(closed_trades)) * 100 if closed_trades else 0
-        avg_win = np.mean([t.pnl for t in winning_trades]) if winning_trades else 0
-        avg_loss = np.mean([abs(t.pnl) for t in losing_trades]) if losing_trades else 0
+        win_rate = (len(wins) / len(pnl)) * 100
+        avg_win = np.mean(wins) if len(wins) else 0
+        avg_loss = np.mean(np.abs(losses)) if len(losses) else 0
         
-        total_wins = sum([t.pnl for t in winning_trades])
-        total_losses = abs(sum([t.pnl for t in losing_trades]))
+        total_wins = running_sum(wins)
+        total_losses = abs(running_sum(losses))
         profit_factor = total_wins / total_losses if total_losses > 0 else 0
         
         return {
             "win_rate": win_rate,
-            "total_trades": len(closed_trades),
-            "winning_trades": len(winning_trades),
-            "losing_trades": len(losing_trades),
+            "total_trades": len(pnl),
+            "winning_trades": len(wins),
+            "losing_trades": len(losses),
             "avg_win": avg_win,
             "avg_loss": avg_loss,
             "profit_factor": profit_factor
         }
+
+    @staticmethod
+    def _var(pnl: np.ndarray, confidence_levels: Sequence[float]) -> List[float]:
+        """VaR at each confidence level, all from one percentile call."""
+        if not len(pnl):
+            return [0.0] * len(confidence_levels)
+        var = np.percentile(pnl, [(1 - level) * 100 for level in confidence_levels])
+        return [abs(v) for v in var]
+
+    @staticmethod
+    def _expectancy(win_rate_stats: Dict[str, float]) -> float:
+        if not win_rate_stats['total_trades']:
+            return 0.0
+        
+        win_rate = win_rate_stats['win_rate'] / 100
+        avg_win = win_rate_stats['avg_win']
+        avg_loss = win_rate_stats['avg_loss']
+        
+        expectancy = (win_rate * avg_win) - ((1 - win_rate) * avg_loss)
+        return expectancy
+
+    @staticmethod
+    def calculate_trade_metrics(trades: TradeData, var_levels: Sequence[float] = (0.95, 0.99)) -> Dict:
+        """
+        All trade-based metrics from one pass over a frame: total PnL, win
+        rate stats, expectancy, Sharpe ratio, max drawdown and VaR at each
+        of ``var_levels`` (keyed ``var_95``, ``var_99``, ...).
+
+        The closed-trade mask and PnL arrays are extracted once and shared
+        by every metric, and each result equals the matching calculate_*
+        method.
+        """
+        frame = as_frame(trades)
+        closed = frame.closed
+        pnl = RiskMetrics._realized_pnl(frame, closed)
+        win_rate_stats = RiskMetrics._win_rate(pnl)
+        drawdown = RiskMetrics._drawdown(*RiskMetrics._equity_curve(frame, closed), include_underwater=False)
+
+        metrics = {
+            "total_pnl": running_sum(fill_missing(frame.pnl[closed])),
+            "total_trades": int(np.count_nonzero(closed)),
+            "max_drawdown": {key: drawdown[key] for key in MAX_DRAWDOWN_KEYS},
+            "win_rate_stats": win_rate_stats,
+            "sharpe_ratio": RiskMetrics._sharpe(RiskMetrics._returns(frame, closed), 0.02),
+            "expectancy": RiskMetrics._expectancy(win_rate_stats)
+        }
+        for level, var in zip(var_levels, RiskMetrics._var(pnl, var_levels)):
+            metrics[f"var_{round(level * 100)}"] = var
+        return metrics
+
+    @staticmethod
+    def calculate_sharpe_ratio(trades: TradeData, risk_free_rate: float = 0.02) -> float:
+        """Calculate Sharpe ratio from trade returns."""
+        frame = as_frame(trades)
+        return RiskMetrics._sharpe(RiskMetrics._returns(frame, frame.closed), risk_free_rate)
+    
+    @staticmethod
+    def calculate_win_rate(trades: TradeData) -> Dict[str, float]:
+        """Calculate win rate and related statistics."""
+        frame = as_frame(trades)
+        return RiskMetrics._win_rate(RiskMetrics._realized_pnl(frame, frame.closed))
     
     @staticmethod
     def calculate_open_risk(positions: List[Dict]) -> Dict[str, float]:
@@ -158,31 +274,24 @@ class RiskMetrics:
         }
     
     @staticmethod
-    def calculate_var(trades: List[Trade], confidence_level: float = 0.95) -> float:
+    def calculate_var(trades: TradeData, confidence_level: float = 0.95) -> float:
         """Calculate Value at Risk (VaR) at given confidence level."""
-        if not trades:
-            return 0.0
-        
-        returns = [t.pnl or 0 for t in trades if t.status == TradeStatus.CLOSED and t.pnl is not None]
-        
-        if not returns:
-            return 0.0
-        
-        var = np.percentile(returns, (1 - confidence_level) * 100)
-        return abs(var)
+        frame = as_frame(trades)
+        return RiskMetrics._var(RiskMetrics._realized_pnl(frame, frame.closed), [confidence_level])[0]
+    
+    @staticmethod
+    def calculate_monte_carlo(trades: TradeData, **options) -> Dict:
+        """
+        Bootstrap simulation of equity paths from the realized PnL of closed
+        trades, in exit order so block resampling keeps streaks. See
+        monte_carlo.simulate_equity_paths for the options and result.
+        """
+        frame = as_frame(trades)
+        closed = np.flatnonzero(frame.closed)
+        order = closed[np.argsort(frame.exit_time[closed], kind='stable')]
+        return simulate_equity_paths(frame.pnl[order], **options)
     
     @staticmethod
-    def calculate_expectancy(trades: List[Trade]) -> float:
+    def calculate_expectancy(trades: TradeData) -> float:
         """Calculate trade expectancy (average expected profit per trade)."""
-        closed_trades = [t for t in trades if t.status == TradeStatus.CLOSED and t.pnl is not None]
-        
-        if not closed_trades:
-            return 0.0
-        
-        win_rate_stats = RiskMetrics.calculate_win_rate(trades)
-        win_rate = win_rate_stats['win_rate'] / 100
-        avg_win = win_rate_stats['avg_win']
-        avg_loss = win_rate_stats['avg_loss']
-        
-        expectancy = (win_rate * avg_win) - ((1 - win_rate) * avg_loss)
-        return expectancy
+        return RiskMetrics._expectancy(RiskMetrics.calculate_win_rate(trades))
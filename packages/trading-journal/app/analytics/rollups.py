@@ -0,0 +1,132 @@
+"""
+Pre-aggregated PnL buckets for the performance timeline
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from .risk_metrics import fill_missing
+from .trade_frame import TradeFrame
+
+PERIODS = ('daily', 'weekly', 'monthly')
+
+# (broker_id, symbol, bucket label as days since the epoch)
+BucketKey = Tuple[str, str, int]
+
+
+def bucket_labels(exit_times: np.ndarray, period: str) -> np.ndarray:
+    """
+    Calendar bucket of each exit time, labelled like pandas resampling: the
+    day, the Sunday ending the (Monday to Sunday) week, or the month end.
+    """
+    days = exit_times.astype('datetime64[D]')
+    if period == 'weekly':
+        # 1970-01-01 was a Thursday, so Monday is 0 in (days + 3) % 7
+        weekday = (days.astype(np.int64) + 3) % 7
+        return days + (6 - weekday)
+    if period == 'monthly':
+        return (exit_times.astype('datetime64[M]') + 1).astype('datetime64[D]') - 1
+    return days
+
+
+def _bucket_range(first: int, last: int, period: str) -> np.ndarray:
+    """Every bucket label from first to last, including empty ones."""
+    if period == 'weekly':
+        return np.arange(first, last + 1, 7)
+    if period == 'monthly':
+        months = np.arange(
+            np.datetime64(first, 'D').astype('datetime64[M]'),
+            np.datetime64(last, 'D').astype('datetime64[M]') + 1
+        )
+        return ((months + 1).astype('datetime64[D]') - 1).astype(np.int64)
+    return np.arange(first, last + 1)
+
+
+class PnLRollups:
+    """
+    Realized PnL summed into daily, weekly and monthly buckets, per broker
+    and symbol. Add closed trades once each with ``add_frame``; timelines
+    are then read from the buckets instead of the trade history.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[BucketKey, float]] = {period: {} for period in PERIODS}
+
+    @classmethod
+    def from_frame(cls, frame: TradeFrame) -> 'PnLRollups':
+        rollups = cls()
+        rollups.add_frame(frame)
+        return rollups
+
+    def add_frame(self, frame: TradeFrame, rows: Optional[np.ndarray] = None) -> None:
+        """Add the closed trades of a frame (or of the given rows) to their buckets."""
+        closed = frame.closed & ~np.isnat(frame.exit_time)
+        rows = np.flatnonzero(closed) if rows is None else rows[closed[rows]]
+        if not len(rows):
+            return
+
+        pnl = fill_missing(frame.pnl[rows])
+        exit_times = frame.exit_time[rows]
+        symbol_count = len(frame.symbols)
+        group = frame.broker[rows].astype(np.int64) * symbol_count + frame.symbol[rows]
+        for period in PERIODS:
+            labels = bucket_labels(exit_times, period).astype(np.int64)
+            # One int64 key per (broker, symbol, bucket), then sum per key
+            first = labels.min()
+            span = int(labels.max() - first) + 1
+            keys, inverse = np.unique(group * span + (labels - first), return_inverse=True)
+            totals = np.bincount(inverse, weights=pnl, minlength=len(keys))
+            buckets = self.buckets[period]
+            for key, total in zip(keys.tolist(), totals.tolist()):
+                code, label = divmod(key, span)
+                key = (frame.brokers[code // symbol_count], frame.symbols[code % symbol_count], int(first) + label)
+                buckets[key] = buckets.get(key, 0.0) + total
+
+    def bucket_count(self) -> int:
+        return sum(len(buckets) for buckets in self.buckets.values())
+
+    def to_dict(self) -> Dict:
+        return {period: [list(key) + [total] for key, total in buckets.items()] for period, buckets in self.buckets.items()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'PnLRollups':
+        rollups = cls()
+        for period in PERIODS:
+            rollups.buckets[period] = {
+                (broker_id, symbol, label): total for broker_id, symbol, label, total in state[period]
+            }
+        return rollups
+
+
+def rollup_timeline(
+    rollups: Iterable[PnLRollups],
+    period: str = "daily",
+    broker_id: Optional[str] = None,
+    symbol: Optional[str] = None
+) -> Dict:
+    """
+    Timeline of period and cumulative PnL from the buckets of one or more
+    rollups, optionally for one broker and/or symbol. Empty periods between
+    the first and last bucket are included with zero PnL.
+    """
+    if period not in PERIODS:
+        period = 'daily'
+
+    totals: Dict[int, float] = {}
+    for store in rollups:
+        for (bucket_broker, bucket_symbol, label), total in store.buckets[period].items():
+            if broker_id is not None and bucket_broker != broker_id:
+                continue
+            if symbol is not None and bucket_symbol != symbol:
+                continue
+            totals[label] = totals.get(label, 0.0) + total
+
+    if not totals:
+        return {"dates": [], "cumulative_pnl": [], "daily_pnl": []}
+
+    labels = _bucket_range(min(totals), max(totals), period)
+    period_pnl = np.array([totals.get(label, 0.0) for label in labels.tolist()])
+    dates = labels.astype('datetime64[D]').astype('datetime64[s]')
+    return {
+        "dates": np.datetime_as_string(dates).tolist(),
+        "period_pnl": period_pnl.tolist(),
+        "cumulative_pnl": np.cumsum(period_pnl).tolist()
+    }
@@ -0,0 +1,244 @@
+"""
+Columnar trade container for analytics
+"""
+import copy
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from ..models.trade import Trade, TradeStatus
+
+STATUS_CODES = {TradeStatus.OPEN: 0, TradeStatus.CLOSED: 1, TradeStatus.CANCELLED: 2}
+CLOSED = STATUS_CODES[TradeStatus.CLOSED]
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Timezone-aware datetimes are stored as naive UTC."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _datetimes(values: Iterable[Optional[datetime]]) -> np.ndarray:
+    """datetime64[us] array with NaT for missing values."""
+    values = list(values)
+    try:
+        # pandas converts datetime objects much faster than np.array
+        index = pd.to_datetime(values)
+    except (TypeError, ValueError):
+        # Mixed naive and timezone-aware values
+        index = pd.to_datetime([_naive(v) for v in values])
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.values.astype('datetime64[us]')
+
+
+def _encode(values: Iterable) -> Tuple[np.ndarray, List]:
+    """Category codes in order of first appearance, plus the categories."""
+    index: Dict = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32)
+    return codes, list(index)
+
+
+class TradeFrame:
+    """
+    Trades stored as typed NumPy columns.
+
+    Numeric columns are float64 with NaN for missing values, times are
+    datetime64[us] with NaT, status is an int8 code (see STATUS_CODES) and
+    symbol/broker are int32 codes into the ``symbols``/``brokers`` lists.
+    Tags are stored flat: ``tag`` holds codes into ``tags`` and the tags of
+    row i are ``tag[tag_offsets[i]:tag_offsets[i + 1]]``.
+    Build one per snapshot with ``from_trades`` or ``from_broker_trades``
+    and pass it to the analytics instead of a list of Trade objects.
+    """
+
+    def __init__(
+        self,
+        pnl: np.ndarray,
+        pnl_percent: np.ndarray,
+        quantity: np.ndarray,
+        entry_time: np.ndarray,
+        exit_time: np.ndarray,
+        status: np.ndarray,
+        symbol: np.ndarray,
+        broker: np.ndarray,
+        symbols: List[str],
+        brokers: List[str],
+        tag: Optional[np.ndarray] = None,
+        tag_offsets: Optional[np.ndarray] = None,
+        tags: Optional[List[str]] = None
+    ):
+        self.pnl = pnl
+        self.pnl_percent = pnl_percent
+        self.quantity = quantity
+        self.entry_time = entry_time
+        self.exit_time = exit_time
+        self.status = status
+        self.symbol = symbol
+        self.broker = broker
+        self.symbols = symbols
+        self.brokers = brokers
+        self.tag = tag if tag is not None else np.zeros(0, dtype=np.int32)
+        self.tag_offsets = tag_offsets if tag_offsets is not None else np.zeros(len(pnl) + 1, dtype=np.int64)
+        self.tags = tags if tags is not None else []
+
+    @classmethod
+    def from_trades(cls, trades: Sequence[Trade], broker_id: Optional[str] = None) -> 'TradeFrame':
+        """
+        Build a frame from Trade objects. When ``broker_id`` is given every
+        trade is attributed to it, otherwise each trade's own broker_id is used.
+        """
+        symbol, symbols = _encode(t.symbol for t in trades)
+        if broker_id is not None:
+            broker = np.zeros(len(trades), dtype=np.int32)
+            brokers = [broker_id]
+        else:
+            broker, brokers = _encode(t.broker_id for t in trades)
+        tag, tags = _encode(chain.from_iterable(t.tags for t in trades))
+        tag_counts = np.fromiter((len(t.tags) for t in trades), dtype=np.int64, count=len(trades))
+
+        return cls(
+            pnl=np.array([t.pnl for t in trades], dtype=np.float64),
+            pnl_percent=np.array([t.pnl_percent for t in trades], dtype=np.float64),
+            quantity=np.array([t.quantity for t in trades], dtype=np.float64),
+            entry_time=_datetimes(t.entry_time for t in trades),
+            exit_time=_datetimes(t.exit_time for t in trades),
+            status=np.fromiter((STATUS_CODES[t.status] for t in trades), dtype=np.int8, count=len(trades)),
+            symbol=symbol,
+            broker=broker,
+            symbols=symbols,
+            brokers=brokers,
+            tag=tag,
+            tag_offsets=np.concatenate(([0], np.cumsum(tag_counts))),
+            tags=tags
+        )
+
+    @classmethod
+    def from_broker_trades(cls, broker_trades: Dict[str, List[Trade]]) -> 'TradeFrame':
+        """Build one frame from per-broker trade lists, keyed by broker id."""
+        return cls.concat([cls.from_trades(trades, broker_id) for broker_id, trades in broker_trades.items()])
+
+    @classmethod
+    def empty(cls) -> 'TradeFrame':
+        return cls.from_trades([])
+
+    @classmethod
+    def concat(cls, frames: Sequence['TradeFrame']) -> 'TradeFrame':
+        """Stack frames, merging their symbol and broker categories."""
+        if not frames:
+            return cls.empty()
+
+        def recode(name: str, categories_name: str) -> Tuple[np.ndarray, List]:
+            index: Dict = {}
+            parts = []
+            for frame in frames:
+                lookup = np.array(
+                    [index.setdefault(c, len(index)) for c in getattr(frame, categories_name)],
+                    dtype=np.int32
+                )
+                parts.append(lookup[getattr(frame, name)])
+            return np.concatenate(parts), list(index)
+
+        symbol, symbols = recode('symbol', 'symbols')
+        broker, brokers = recode('broker', 'brokers')
+        tag, tags = recode('tag', 'tags')
+        tag_counts = np.concatenate([np.diff(f.tag_offsets) for f in frames])
+        return cls(
+            pnl=np.concatenate([f.pnl for f in frames]),
+            pnl_percent=np.concatenate([f.pnl_percent for f in frames]),
+            quantity=np.concatenate([f.quantity for f in frames]),
+            entry_time=np.concatenate([f.entry_time for f in frames]),
+            exit_time=np.concatenate([f.exit_time for f in frames]),
+            status=np.concatenate([f.status for f in frames]),
+            symbol=symbol,
+            broker=broker,
+            symbols=symbols,
+            brokers=brokers,
+            tag=tag,
+            tag_offsets=np.concatenate(([0], np.cumsum(tag_counts))),
+            tags=tags
+        )
+
+    def __len__(self) -> int:
+        return len(self.pnl)
+
+    def take(self, rows: np.ndarray) -> 'TradeFrame':
+        """Subset by boolean mask or row indices, keeping the categories."""
+        index = np.arange(len(self))[rows]
+        starts = self.tag_offsets[index]
+        counts = self.tag_offsets[index + 1] - starts
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Positions of the kept rows' tags in the flat tag column
+        positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+        return TradeFrame(
+            pnl=self.pnl[rows],
+            pnl_percent=self.pnl_percent[rows],
+            quantity=self.quantity[rows],
+            entry_time=self.entry_time[rows],
+            exit_time=self.exit_time[rows],
+            status=self.status[rows],
+            symbol=self.symbol[rows],
+            broker=self.broker[rows],
+            symbols=self.symbols,
+            brokers=self.brokers,
+            tag=self.tag[positions],
+            tag_offsets=offsets,
+            tags=self.tags
+        )
+
+    def rows(self, start: int, end: int) -> 'TradeFrame':
+        """Rows start:end as views of the columns, without copying them."""
+        tag_start, tag_end = self.tag_offsets[start], self.tag_offsets[end]
+        return TradeFrame(
+            pnl=self.pnl[start:end],
+            pnl_percent=self.pnl_percent[start:end],
+            quantity=self.quantity[start:end],
+            entry_time=self.entry_time[start:end],
+            exit_time=self.exit_time[start:end],
+            status=self.status[start:end],
+            symbol=self.symbol[start:end],
+            broker=self.broker[start:end],
+            symbols=self.symbols,
+            brokers=self.brokers,
+            tag=self.tag[tag_start:tag_end],
+            tag_offsets=self.tag_offsets[start:end + 1] - tag_start,
+            tags=self.tags
+        )
+
+    @property
+    def closed(self) -> np.ndarray:
+        """Mask of closed trades."""
+        return self.status == CLOSED
+
+    def between(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> 'TradeFrame':
+        """Trades with start_time <= entry_time <= end_time."""
+        if start_time is None and end_time is None:
+            return self
+        mask = np.ones(len(self), dtype=bool)
+        if start_time is not None:
+            mask &= self.entry_time >= np.datetime64(_naive(start_time), 'us')
+        if end_time is not None:
+            mask &= self.entry_time <= np.datetime64(_naive(end_time), 'us')
+        return self.take(mask)
+
+    def replace(self, **columns: np.ndarray) -> 'TradeFrame':
+        """Shallow copy with some columns swapped, e.g. PnL in another currency."""
+        frame = copy.copy(self)
+        frame.__dict__.update(columns)
+        return frame
+
+    def for_broker(self, broker_id: str) -> 'TradeFrame':
+        if broker_id not in self.brokers:
+            return self.take(np.zeros(len(self), dtype=bool))
+        return self.take(self.broker == self.brokers.index(broker_id))
+
+
+# What the analytics accept: a TradeFrame or a plain list of trades
+TradeData = Union[Sequence[Trade], TradeFrame]
+
+
+def as_frame(trades: TradeData) -> TradeFrame:
+    """Accept either a TradeFrame or a list of Trade objects."""
+    return trades if isinstance(trades, TradeFrame) else TradeFrame.from_trades(trades)
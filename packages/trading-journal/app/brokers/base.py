@@ -1,7 +1,10 @@
+import asyncio
+from bisect import bisect_right
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 from ..models.trade import Trade, TradeStatus
+from ..pagination import TradeKey, trade_key
 
 class BrokerBase(ABC):
     """Base class for all broker implementations."""
@@ -32,6 +35,60 @@ class BrokerBase(ABC):
         """Retrieve trades from the broker."""
         pass
 
+    async def stream_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> AsyncIterator[Trade]:
+        """
+        Yield trades one at a time.
+
+        The default fetches the full list with get_trades. Brokers that can
+        read their history incrementally override this.
+        """
+        trades = await self.get_trades(symbol=symbol, start_time=start_time, end_time=end_time, status=status)
+        for trade in trades:
+            yield trade
+
+    async def get_trades_page(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        after: Optional[TradeKey] = None,
+        limit: int = 1000
+    ) -> List[Trade]:
+        """
+        Up to ``limit`` trades ordered by (entry_time, id), starting after
+        the ``after`` key.
+
+        The default sorts the full get_trades result. CachedBroker keeps the
+        sorted list (or the synced store) so later pages seek to the key.
+        """
+        trades = sorted(
+            await self.get_trades(symbol=symbol, start_time=start_time, end_time=end_time, status=status),
+            key=trade_key
+        )
+        start = 0
+        if after is not None:
+            start = bisect_right(trades, after, key=trade_key)
+        return trades[start:start + limit]
+
+    async def get_trades_since(self, cursor: dict) -> Tuple[List[Trade], dict]:
+        """
+        Retrieve trades that are new or may have changed since a sync cursor.
+
+        The default re-fetches from the cursor's ``since`` watermark (epoch
+        seconds). Brokers with a cheaper incremental API override this.
+        """
+        since = cursor.get('since')
+        start_time = datetime.fromtimestamp(since) if since is not None else None
+        trades = await self.get_trades(start_time=start_time)
+        return trades, cursor
+
     @abstractmethod
     async def get_balance(self) -> dict:
         """Get account balance."""
@@ -46,3 +103,13 @@ class BrokerBase(ABC):
     async def get_market_data(self, symbol: str) -> dict:
         """Get current market data for a symbol."""
         pass
+
+    async def get_market_data_batch(self, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Get current market data for several symbols, keyed by symbol.
+
+        The default calls get_market_data for every symbol concurrently.
+        Brokers with a bulk quote API override this.
+        """
+        results = await asyncio.gather(*(self.get_market_data(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
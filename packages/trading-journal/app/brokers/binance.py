@@ -1,13 +1,27 @@
 import ccxt.async_support as ccxt
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from ..models.trade import Trade, TradeStatus, TradeType
 from .base import BrokerBase
+from .binance_history import BinanceHistoryFetcher, DAY_MS
 
 class BinanceBroker(BrokerBase):
-    """Binance exchange broker implementation."""
+    """
+    Binance exchange broker implementation.
+
+    Trade history is pulled per symbol (Binance needs one for futures
+    history) in concurrent, paginated time windows. The symbols are the
+    configured ``symbols`` plus any with an open position.
+    """
     
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        symbols: Optional[List[str]] = None,
+        history_days: int = 30,
+        history_concurrency: int = 5
+    ):
         super().__init__(api_key, api_secret)
         self.exchange = ccxt.binance({
             'apiKey': api_key,
@@ -18,6 +32,9 @@ class BinanceBroker(BrokerBase):
                 'adjustForTimeDifference': True,
             }
         })
+        self.symbols = list(symbols or [])
+        self.history_days = history_days
+        self.history = BinanceHistoryFetcher(self.exchange, max_concurrency=history_concurrency)
 
     async def connect(self) -> bool:
         """Establish connection to Binance API."""
@@ -36,6 +53,14 @@ class BinanceBroker(BrokerBase):
             await self.exchange.close()
         self.connected = False
 
+    async def _history_symbols(self) -> List[str]:
+        """Symbols to pull history for: configured ones plus any with open positions."""
+        symbols = list(self.symbols)
+        for position in await self.get_positions():
+            if position['symbol'] not in symbols:
+                symbols.append(position['symbol'])
+        return symbols
+
     async def get_trades(
         self, 
         symbol: Optional[str] = None,
@@ -47,39 +72,86 @@ class BinanceBroker(BrokerBase):
         if not self.connected:
             await self.connect()
 
-        params = {}
-        if start_time:
-            params['startTime'] = int(start_time.timestamp() * 1000)
-        if end_time:
-            params['endTime'] = int(end_time.timestamp() * 1000)
+        end_ms = int((end_time or datetime.now()).timestamp() * 1000)
+        start_ms = int(start_time.timestamp() * 1000) if start_time else end_ms - self.history_days * DAY_MS
 
         trades = []
         try:
-            # This is a simplified example - you'd need to map Binance's trade format to our Trade model
-            raw_trades = await self.exchange.fetch_my_trades(symbol, params=params)
-            
-            for trade in raw_trades:
-                trade_type = TradeType.BUY if trade['side'] == 'buy' else TradeType.SELL
-                trades.append(Trade(
-                    id=str(trade['id']),
-                    broker_id='binance',
-                    symbol=trade['symbol'],
-                    type=trade_type,
-                    status=TradeStatus.CLOSED,  # Binance trades are always closed
-                    quantity=float(trade['amount']),
-                    entry_price=float(trade['price']),
-                    exit_price=float(trade['price']),
-                    entry_time=datetime.fromtimestamp(trade['timestamp'] / 1000),
-                    exit_time=datetime.fromtimestamp(trade['timestamp'] / 1000),
-                    commission=float(trade['fee']['cost']) if trade.get('fee') else 0.0,
-                    pnl=float(trade.get('realizedPnl', 0)),
-                ))
-                
+            symbols = [symbol] if symbol else await self._history_symbols()
+            if symbols:
+                raw_trades = await self.history.fetch(symbols, start_ms, end_ms)
+            else:
+                # No symbols known yet: fall back to a single unscoped request
+                params = {}
+                if start_time:
+                    params['startTime'] = start_ms
+                if end_time:
+                    params['endTime'] = end_ms
+                raw_trades = await self.exchange.fetch_my_trades(None, params=params)
+            trades = Trade.trusted_batch(self._trade_fields(trade) for trade in raw_trades)
         except Exception as e:
             print(f"Error fetching trades from Binance: {e}")
             
         return trades
 
+    async def get_trades_since(self, cursor: dict) -> Tuple[List[Trade], dict]:
+        """
+        Retrieve new trades since a sync cursor.
+
+        Symbols seen before are paged by ``fromId`` (Binance trade ids only
+        grow). Symbols not synced before are fetched in time windows from
+        the cursor watermark.
+        """
+        if not self.connected:
+            await self.connect()
+
+        cursor = dict(cursor)
+        from_ids: Dict[str, int] = dict(cursor.get('from_id', {}))
+        pages = []
+        try:
+            if from_ids:
+                pages.append(await self.history.fetch_from_ids(
+                    {symbol: last_id + 1 for symbol, last_id in from_ids.items()}
+                ))
+
+            end_ms = int(datetime.now().timestamp() * 1000)
+            since = cursor.get('since')
+            start_ms = int(since * 1000) if since is not None else end_ms - self.history_days * DAY_MS
+            new_symbols = [s for s in await self._history_symbols() if s not in from_ids]
+            if new_symbols:
+                pages.append(await self.history.fetch(new_symbols, start_ms, end_ms))
+            elif not from_ids:
+                params = {'startTime': start_ms} if since is not None else {}
+                pages.append(await self.exchange.fetch_my_trades(None, params=params))
+        except Exception as e:
+            print(f"Error syncing trades from Binance: {e}")
+
+        raw_trades = self.history.merge(pages)
+        for trade in raw_trades:
+            from_ids[trade['symbol']] = max(from_ids.get(trade['symbol'], 0), int(trade['id']))
+        cursor['from_id'] = from_ids
+
+        return Trade.trusted_batch(self._trade_fields(trade) for trade in raw_trades), cursor
+
+    def _trade_fields(self, trade: dict) -> dict:
+        """Map a ccxt trade to typed Trade fields, for Trade.trusted_batch."""
+        trade_type = TradeType.BUY if trade['side'] == 'buy' else TradeType.SELL
+        timestamp = datetime.fromtimestamp(trade['timestamp'] / 1000)
+        return dict(
+            id=str(trade['id']),
+            broker_id='binance',
+            symbol=trade['symbol'],
+            type=trade_type,
+            status=TradeStatus.CLOSED,  # Binance trades are always closed
+            quantity=float(trade['amount']),
+            entry_price=float(trade['price']),
+            exit_price=float(trade['price']),
+            entry_time=timestamp,
+            exit_time=timestamp,
+            commission=float(trade['fee']['cost']) if trade.get('fee') else 0.0,
+            pnl=float(trade.get('realizedPnl', 0)),
+        )
+
     async def get_balance(self) -> dict:
         """Get account balance from Binance."""
         if not self.connected:
@@ -120,6 +192,18 @@ class BinanceBroker(BrokerBase):
             print(f"Error fetching positions from Binance: {e}")
             return []
 
+    @staticmethod
+    def _to_market(symbol: str, ticker: dict) -> dict:
+        """Convert a ccxt ticker into the market data dict."""
+        return {
+            'symbol': symbol,
+            'last': float(ticker['last']) if ticker['last'] else None,
+            'bid': float(ticker['bid']) if ticker['bid'] else None,
+            'ask': float(ticker['ask']) if ticker['ask'] else None,
+            'volume': float(ticker['baseVolume']) if ticker['baseVolume'] else None,
+            'timestamp': datetime.fromtimestamp(ticker['timestamp'] / 1000) if ticker['timestamp'] else None
+        }
+
     async def get_market_data(self, symbol: str) -> dict:
         """Get current market data for a symbol from Binance."""
         if not self.connected:
@@ -127,14 +211,23 @@ class BinanceBroker(BrokerBase):
             
         try:
             ticker = await self.exchange.fetch_ticker(symbol)
-            return {
-                'symbol': symbol,
-                'last': float(ticker['last']) if ticker['last'] else None,
-                'bid': float(ticker['bid']) if ticker['bid'] else None,
-                'ask': float(ticker['ask']) if ticker['ask'] else None,
-                'volume': float(ticker['baseVolume']) if ticker['baseVolume'] else None,
-                'timestamp': datetime.fromtimestamp(ticker['timestamp'] / 1000) if ticker['timestamp'] else None
-            }
+            return self._to_market(symbol, ticker)
         except Exception as e:
             print(f"Error fetching market data from Binance for {symbol}: {e}")
             return {'symbol': symbol}
+
+    async def get_market_data_batch(self, symbols: List[str]) -> Dict[str, dict]:
+        """Get market data for many symbols with a single fetch_tickers call."""
+        if not self.connected:
+            await self.connect()
+
+        try:
+            tickers = await self.exchange.fetch_tickers(symbols)
+        except Exception as e:
+            print(f"Error fetching market data from Binance for {len(symbols)} symbols: {e}")
+            return {symbol: {'symbol': symbol} for symbol in symbols}
+
+        return {
+            symbol: self._to_market(symbol, tickers[symbol]) if symbol in tickers else {'symbol': symbol}
+            for symbol in symbols
+        }
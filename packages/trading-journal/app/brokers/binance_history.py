@@ -0,0 +1,118 @@
+"""
+Concurrent, paginated Binance trade history fetching
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class RateBudget:
+    """
+    Token bucket shared by all history pages of one exchange client.
+
+    ``rate`` requests per second are allowed on average, with bursts of up
+    to ``burst`` requests.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 10):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BinanceHistoryFetcher:
+    """
+    Fetches complete trade history from a ccxt Binance client.
+
+    A request is split into (symbol, time-window) pages that run
+    concurrently under a shared RateBudget and a concurrency limit. A page
+    that comes back full is continued with ``fromId`` until it is
+    exhausted. Results are merged, deduplicated by (symbol, id) and sorted
+    by timestamp.
+    """
+
+    def __init__(
+        self,
+        exchange,
+        window_days: int = 7,
+        page_limit: int = 1000,
+        max_concurrency: int = 5,
+        budget: Optional[RateBudget] = None
+    ):
+        self.exchange = exchange
+        self.window_ms = window_days * DAY_MS
+        self.page_limit = page_limit
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.budget = budget or RateBudget()
+
+    async def _call(self, symbol: str, params: Dict) -> List[dict]:
+        async with self._semaphore:
+            await self.budget.acquire()
+            return await self.exchange.fetch_my_trades(symbol, limit=self.page_limit, params=params)
+
+    async def _follow(self, symbol: str, page: List[dict], end_ms: Optional[int]) -> List[dict]:
+        """Continue a full page with fromId until the window is exhausted."""
+        trades = list(page)
+        while len(page) >= self.page_limit:
+            from_id = max(int(t['id']) for t in page) + 1
+            page = await self._call(symbol, {'fromId': from_id})
+            if end_ms is not None:
+                page = [t for t in page if t['timestamp'] <= end_ms]
+            trades.extend(page)
+        return trades
+
+    async def _fetch_window(self, symbol: str, start_ms: int, end_ms: int) -> List[dict]:
+        page = await self._call(symbol, {'startTime': start_ms, 'endTime': end_ms})
+        return await self._follow(symbol, page, end_ms)
+
+    async def _fetch_from_id(self, symbol: str, from_id: int) -> List[dict]:
+        page = await self._call(symbol, {'fromId': from_id})
+        return await self._follow(symbol, page, None)
+
+    def windows(self, start_ms: int, end_ms: int) -> Iterable[Tuple[int, int]]:
+        """Split [start_ms, end_ms] into consecutive windows of at most window_ms."""
+        cursor = start_ms
+        while cursor <= end_ms:
+            window_end = min(cursor + self.window_ms - 1, end_ms)
+            yield cursor, window_end
+            cursor = window_end + 1
+
+    @staticmethod
+    def merge(pages: List[List[dict]]) -> List[dict]:
+        """Merge pages into one stream sorted by time, without duplicates."""
+        unique = {}
+        for page in pages:
+            for trade in page:
+                unique[(trade['symbol'], str(trade['id']))] = trade
+        return sorted(unique.values(), key=lambda t: (t['timestamp'], int(t['id'])))
+
+    async def fetch(self, symbols: List[str], start_ms: int, end_ms: int) -> List[dict]:
+        """Fetch all trades for the given symbols between start_ms and end_ms."""
+        pages = await asyncio.gather(*(
+            self._fetch_window(symbol, window_start, window_end)
+            for symbol in symbols
+            for window_start, window_end in self.windows(start_ms, end_ms)
+        ))
+        return self.merge(pages)
+
+    async def fetch_from_ids(self, from_ids: Dict[str, int]) -> List[dict]:
+        """Fetch every trade with an id of at least from_ids[symbol], per symbol."""
+        pages = await asyncio.gather(*(
+            self._fetch_from_id(symbol, from_id) for symbol, from_id in from_ids.items()
+        ))
+        return self.merge(pages)
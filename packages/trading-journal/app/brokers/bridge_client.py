@@ -0,0 +1,138 @@
+"""
+Pooled, retrying HTTP client for REST broker bridges (e.g. the MT4 bridge)
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import aiohttp
+
+# Responses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EndpointStats:
+    """Latency and error counters for one bridge endpoint."""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self._recent.append(seconds)
+
+    def summary(self) -> Dict:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_ms': (self.total_seconds / self.requests * 1000) if self.requests else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': self.max_seconds * 1000
+        }
+
+
+class BridgeClient:
+    """
+    JSON-over-HTTP client for a broker bridge.
+
+    One keep-alive session with a bounded connection pool is shared by all
+    calls. Each attempt has its own timeout; connection errors, timeouts and
+    retryable statuses are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 10,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 10.0,
+        retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 5.0
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats: Dict[str, EndpointStats] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def get_json(
+        self,
+        path: str,
+        params: Optional[Dict] = None,
+        endpoint: Optional[str] = None
+    ) -> Tuple[int, Any]:
+        """
+        GET a bridge path and return (status, parsed JSON).
+
+        The JSON is None for non-200 responses. Raises the last error if
+        every attempt fails with a connection error or timeout.
+        """
+        endpoint = endpoint or path
+        stats = self._stats.setdefault(endpoint, EndpointStats())
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+
+            started = time.perf_counter()
+            try:
+                async with self._get_session().get(url, params=params) as response:
+                    data = await response.json(content_type=None) if response.status == 200 else None
+                    stats.record(time.perf_counter() - started, response.status == 200)
+                    if response.status in RETRYABLE_STATUSES and attempt < self.retries:
+                        continue
+                    return response.status, data
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.record(time.perf_counter() - started, False)
+                if attempt == self.retries:
+                    raise
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict[str, Dict]:
+        return {endpoint: s.summary() for endpoint, s in self._stats.items()}
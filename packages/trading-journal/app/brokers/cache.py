@@ -0,0 +1,254 @@
+"""
+TTL snapshot cache in front of broker data calls
+"""
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+from ..models.trade import Trade, TradeStatus
+from ..pagination import TradeKey, trade_key
+from .base import BrokerBase
+from .singleflight import SingleFlight
+from .sync import TradeSync
+
+
+class SnapshotCache:
+    """Size-bounded LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) for a key, dropping it if it has expired."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries when full."""
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, broker_id: Optional[str] = None, method: Optional[str] = None) -> None:
+        """Drop all entries, or only those of one broker (and optionally one method)."""
+        if broker_id is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == broker_id and (method is None or k[1] == method)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self.invalidate()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
+
+
+class CachedBroker(BrokerBase):
+    """
+    Wraps a broker so trades, positions and balances are served from a
+    shared SnapshotCache while fresh. Market data is kept per symbol in a
+    separate short-lived ``ticks`` cache when one is given.
+
+    Cache misses and market data calls go through a SingleFlight, so
+    concurrent identical calls share one request to the broker. When a
+    TradeSync is given, trades are synced incrementally and served from its
+    local store.
+    """
+
+    def __init__(
+        self,
+        broker_id: str,
+        broker: BrokerBase,
+        cache: SnapshotCache,
+        flights: Optional[SingleFlight] = None,
+        sync: Optional[TradeSync] = None,
+        ticks: Optional[SnapshotCache] = None
+    ):
+        self.broker_id = broker_id
+        self.wrapped = broker
+        self.cache = cache
+        self.flights = flights or SingleFlight()
+        self.sync = sync
+        self.ticks = ticks
+
+    async def _cached(self, key: Tuple, fetch) -> Any:
+        found, value = self.cache.get(key)
+        if found:
+            return value
+
+        async def load() -> Any:
+            value = await fetch()
+            self.cache.set(key, value)
+            return value
+
+        return await self.flights.do(key, load)
+
+    async def connect(self) -> bool:
+        return await self.wrapped.connect()
+
+    async def disconnect(self) -> None:
+        self.cache.invalidate(self.broker_id)
+        if self.ticks is not None:
+            self.ticks.invalidate(self.broker_id)
+        await self.wrapped.disconnect()
+
+    async def get_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> List[Trade]:
+        """Retrieve trades, keyed by (symbol, start_time, end_time, status)."""
+        key = (self.broker_id, 'trades', symbol, start_time, end_time, status)
+        if self.sync is not None:
+            return await self._cached(key, lambda: self.sync.get_trades(
+                self.broker_id, self.wrapped, symbol, start_time, end_time, status
+            ))
+
+        kwargs = {'symbol': symbol, 'start_time': start_time, 'end_time': end_time}
+        if status is not None:
+            kwargs['status'] = status
+        return await self._cached(key, lambda: self.wrapped.get_trades(**kwargs))
+
+    async def stream_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> AsyncIterator[Trade]:
+        """
+        Stream trades from a fresh cached list if there is one, otherwise
+        from the trade sync store or the broker. Streamed results are not
+        cached, since that would hold the whole list in memory.
+        """
+        found, trades = self.cache.get((self.broker_id, 'trades', symbol, start_time, end_time, status))
+        if found:
+            for trade in trades:
+                yield trade
+            return
+
+        if self.sync is not None:
+            source = self.sync.stream_trades(self.broker_id, self.wrapped, symbol, start_time, end_time, status)
+        else:
+            source = self.wrapped.stream_trades(symbol, start_time, end_time, status)
+        async for trade in source:
+            yield trade
+
+    async def get_trades_page(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        after: Optional[TradeKey] = None,
+        limit: int = 1000
+    ) -> List[Trade]:
+        """
+        One page of trades ordered by (entry_time, id). Pages come from the
+        trade sync store when enabled, otherwise from a cached sorted copy of
+        the trade list, so any page is found by a seek rather than a scan.
+        """
+        if self.sync is not None:
+            return await self.sync.get_trades_page(
+                self.broker_id, self.wrapped, symbol, start_time, end_time, status, after, limit
+            )
+
+        async def load_sorted() -> List[Trade]:
+            trades = await self.get_trades(symbol, start_time, end_time, status)
+            return sorted(trades, key=trade_key)
+
+        trades = await self._cached(
+            (self.broker_id, 'trades', symbol, start_time, end_time, status, 'sorted'), load_sorted
+        )
+        start = 0
+        if after is not None:
+            start = bisect_right(trades, after, key=trade_key)
+        return trades[start:start + limit]
+
+    async def get_balance(self) -> dict:
+        return await self._cached((self.broker_id, 'balance'), self.wrapped.get_balance)
+
+    async def get_positions(self) -> List[dict]:
+        return await self._cached((self.broker_id, 'positions'), self.wrapped.get_positions)
+
+    def _store_tick(self, symbol: str, data: dict) -> None:
+        # Only cache real quotes; a bare {'symbol': ...} means the fetch failed
+        if self.ticks is not None and len(data) > 1:
+            self.ticks.set((self.broker_id, 'market', symbol), data)
+
+    async def get_market_data(self, symbol: str) -> dict:
+        key = (self.broker_id, 'market', symbol)
+        if self.ticks is not None:
+            found, value = self.ticks.get(key)
+            if found:
+                return value
+
+        async def load() -> dict:
+            data = await self.wrapped.get_market_data(symbol)
+            self._store_tick(symbol, data)
+            return data
+
+        return await self.flights.do(key, load)
+
+    async def get_market_data_batch(self, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Serve fresh ticks from the tick cache and fetch the rest in one
+        batch call to the broker.
+        """
+        results: Dict[str, dict] = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            found, value = False, None
+            if self.ticks is not None:
+                found, value = self.ticks.get((self.broker_id, 'market', symbol))
+            if found:
+                results[symbol] = value
+            else:
+                missing.append(symbol)
+
+        if missing:
+            async def load() -> Dict[str, dict]:
+                data = await self.wrapped.get_market_data_batch(missing)
+                for symbol, tick in data.items():
+                    self._store_tick(symbol, tick)
+                return data
+
+            key = (self.broker_id, 'market_batch', tuple(sorted(missing)))
+            results.update(await self.flights.do(key, load))
+
+        return {symbol: results.get(symbol, {'symbol': symbol}) for symbol in symbols}
@@ -0,0 +1,143 @@
+"""
+Concurrent data fetching across all configured brokers
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..analytics.trade_frame import TradeFrame
+from ..models.trade import Trade
+from .base import BrokerBase
+
+DEFAULT_INCLUDE = ('trades', 'positions', 'balance')
+
+
+class FanOutResult:
+    """Data collected from every broker, plus per-broker failures and timings"""
+
+    def __init__(self):
+        self.trades: Dict[str, List[Trade]] = {}
+        self.positions: Dict[str, List[Dict]] = {}
+        self.balances: Dict[str, Dict] = {}
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        # 'live' for a fan-out, 'snapshot' when served by the BrokerPoller
+        self.source = 'live'
+        self.ages: Dict[str, float] = {}
+        # Per-broker TradeFrames, when already built (e.g. by the poller)
+        self.frames: Dict[str, TradeFrame] = {}
+        self._frame: Optional[TradeFrame] = None
+
+    @property
+    def succeeded(self) -> List[str]:
+        """Brokers that returned every requested dataset"""
+        return [broker_id for broker_id in self.timings if broker_id not in self.errors]
+
+    @property
+    def partial_brokers(self) -> List[str]:
+        """Failed brokers that still returned some of the requested datasets"""
+        return [
+            broker_id for broker_id in self.errors
+            if broker_id in self.trades or broker_id in self.positions or broker_id in self.balances
+        ]
+
+    def frame(self) -> TradeFrame:
+        """All trades as one TradeFrame, built at most once per result."""
+        if self._frame is None:
+            self._frame = TradeFrame.concat([
+                self.frames[broker_id] if broker_id in self.frames else TradeFrame.from_trades(trades, broker_id)
+                for broker_id, trades in self.trades.items()
+            ])
+        return self._frame
+
+    def report(self) -> Dict:
+        """Summary of the fetch for inclusion in API responses"""
+        report = {
+            'source': self.source,
+            'succeeded': self.succeeded,
+            'failed': dict(self.errors),
+            'partial': bool(self.errors),
+            'partial_brokers': self.partial_brokers,
+            'timings_ms': {k: round(v * 1000, 2) for k, v in self.timings.items()}
+        }
+        if self.source == 'snapshot':
+            report['snapshot_age_seconds'] = {k: round(v, 2) for k, v in self.ages.items()}
+        return report
+
+
+async def _fetch_broker(
+    broker: BrokerBase,
+    include: Sequence[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime]
+) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Run all requested calls for one broker concurrently. Returns the
+    datasets that succeeded and the errors of those that failed, so one
+    failing call does not discard the others.
+    """
+    calls = {}
+    if 'trades' in include:
+        calls['trades'] = broker.get_trades(start_time=start_time, end_time=end_time)
+    if 'positions' in include:
+        calls['positions'] = broker.get_positions()
+    if 'balance' in include:
+        calls['balance'] = broker.get_balance()
+
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    data = {}
+    errors = {}
+    for dataset, value in zip(calls.keys(), results):
+        if isinstance(value, Exception):
+            errors[dataset] = str(value)
+        else:
+            data[dataset] = value
+    return data, errors
+
+
+async def fan_out(
+    brokers: Dict[str, BrokerBase],
+    include: Sequence[str] = DEFAULT_INCLUDE,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    timeout: Optional[float] = None
+) -> FanOutResult:
+    """
+    Fetch trades, positions and/or balances from all brokers at the same time.
+
+    Each broker gets its own timeout. A broker that fails or times out is
+    reported in ``errors`` and left out of the data, so callers still get the
+    results of every broker that answered. When only some of a broker's
+    calls fail, the datasets that succeeded are kept and the broker is
+    listed in ``partial_brokers``.
+    """
+    result = FanOutResult()
+
+    async def run(broker_id: str, broker: BrokerBase) -> None:
+        started = time.perf_counter()
+        try:
+            data, errors = await asyncio.wait_for(
+                _fetch_broker(broker, include, start_time, end_time),
+                timeout=timeout
+            )
+            if 'trades' in data:
+                result.trades[broker_id] = data['trades']
+            if 'positions' in data:
+                result.positions[broker_id] = data['positions']
+            if 'balance' in data:
+                result.balances[broker_id] = data['balance']
+            if errors:
+                # Keep what the broker did return and report it as partial
+                result.errors[broker_id] = '; '.join(f"{k}: {v}" for k, v in errors.items())
+                print(f"Error fetching data from {broker_id}: {result.errors[broker_id]}")
+        except asyncio.TimeoutError:
+            result.errors[broker_id] = f"timed out after {timeout}s"
+            print(f"Error fetching data from {broker_id}: timed out after {timeout}s")
+        except Exception as e:
+            result.errors[broker_id] = str(e)
+            print(f"Error fetching data from {broker_id}: {e}")
+        finally:
+            result.timings[broker_id] = time.perf_counter() - started
+
+    await asyncio.gather(*(run(broker_id, broker) for broker_id, broker in brokers.items()))
+    return result
@@ -0,0 +1,186 @@
+"""
+Cached FX rate table, refreshed from the brokers' own tickers
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from ..analytics.fx import RateTable
+from .base import BrokerBase
+from .singleflight import SingleFlight
+
+# Stablecoins valued at their peg currency's rate unless the rate file says otherwise
+DEFAULT_PEGS = {'USDT': 'USD', 'USDC': 'USD'}
+
+
+def _price(market: Dict) -> Optional[float]:
+    """Mid price of a ticker (last price without a quote), if it has one."""
+    bid, ask = market.get('bid'), market.get('ask')
+    price = (bid + ask) / 2 if bid and ask else market.get('last')
+    if price is None or not math.isfinite(price) or price <= 0:
+        return None
+    return float(price)
+
+
+class FxRates:
+    """
+    Value of one unit of each currency in the base currency.
+
+    Rates come from the brokers' tickers ("EUR/USD", "EURUSD", or the
+    inverse pair), through a bridge currency such as USDT when there is no
+    direct pair, and are cached for ``ttl`` seconds, so a currency costs
+    one lookup per TTL rather than one per balance or trade. A local
+    ``rate_file`` (JSON object of currency to rate, reloaded when it
+    changes) covers currencies no broker quotes, e.g. {"DAI": 1.0}.
+
+    Currencies in ``pegs`` (default: USDT and USDC to USD) are not quoted:
+    they take the rate of the currency they are pegged to, unless the rate
+    file has an entry for them.
+    """
+
+    def __init__(
+        self,
+        brokers: Dict[str, BrokerBase],
+        base: str = 'USD',
+        ttl: float = 300.0,
+        rate_file: Optional[str] = None,
+        bridges: Sequence[str] = ('USDT',),
+        pegs: Optional[Dict[str, str]] = None
+    ):
+        self.brokers = brokers
+        self.base = base
+        self.ttl = ttl
+        self.rate_file = rate_file
+        self.bridges = [b for b in bridges if b != base]
+        self.pegs = dict(DEFAULT_PEGS if pegs is None else pegs)
+        # currency -> (expires_at, rate); NaN marks a failed lookup
+        self._rates: Dict[str, Tuple[float, float]] = {}
+        self._file_rates: Dict[str, float] = {}
+        self._file_mtime: Optional[float] = None
+        self._flights = SingleFlight()
+        self.lookups = 0
+        self.updated_at: Optional[datetime] = None
+
+    def _load_file(self) -> Dict[str, float]:
+        if not self.rate_file:
+            return {}
+        try:
+            mtime = os.path.getmtime(self.rate_file)
+            if mtime != self._file_mtime:
+                with open(self.rate_file) as f:
+                    self._file_rates = {c: float(r) for c, r in json.load(f).items()}
+                self._file_mtime = mtime
+        except Exception as e:
+            print(f"Error loading FX rate file {self.rate_file}: {e}")
+        return self._file_rates
+
+    def _cached(self, currency: str) -> Optional[float]:
+        entry = self._rates.get(currency)
+        if entry is None or entry[0] <= time.monotonic() or math.isnan(entry[1]):
+            return None
+        return entry[1]
+
+    def _fixed(self, currency: str) -> Optional[float]:
+        """Rate of a currency from the rate file or, for a pegged one, its peg."""
+        file_rate = self._load_file().get(currency)
+        if file_rate is not None:
+            return file_rate
+        target = self.pegs.get(currency)
+        if target is None:
+            return None
+        return 1.0 if target == self.base else self._cached(target)
+
+    def _lookup(self, currency: str) -> str:
+        """The currency to quote for a currency: its peg, unless the rate file covers it."""
+        if currency in self.pegs and currency not in self._load_file():
+            return self.pegs[currency]
+        return currency
+
+    async def _quote(self, currency: str, quote: str) -> Optional[float]:
+        """Price of one unit of currency in quote from the first broker that has the pair."""
+        symbols = [f"{currency}/{quote}", f"{currency}{quote}", f"{quote}/{currency}", f"{quote}{currency}"]
+        for broker in self.brokers.values():
+            self.lookups += 1
+            results = await asyncio.gather(
+                *(broker.get_market_data(symbol) for symbol in symbols), return_exceptions=True
+            )
+            for i, market in enumerate(results):
+                price = _price(market) if isinstance(market, dict) else None
+                if price is not None:
+                    return price if i < 2 else 1 / price
+        return None
+
+    async def _resolve(self, currency: str) -> float:
+        rate = await self._quote(currency, self.base)
+        if rate is None:
+            for bridge in self.bridges:
+                if bridge == currency:
+                    continue
+                bridge_rate = self._cached(bridge) or self._fixed(bridge)
+                if bridge_rate is None:
+                    continue
+                price = await self._quote(currency, bridge)
+                if price is not None:
+                    rate = price * bridge_rate
+                    break
+        return rate if rate is not None else math.nan
+
+    async def _refresh(self, currencies: List[str]) -> None:
+        # Peg currencies, then bridges, so the currencies quoted against
+        # them can use them
+        targets = set(self.pegs.values())
+        groups = (
+            [c for c in currencies if c in targets],
+            [c for c in currencies if c in self.bridges and c not in targets],
+            [c for c in currencies if c not in self.bridges and c not in targets]
+        )
+        for group in groups:
+            rates = await asyncio.gather(*(self._resolve(c) for c in group))
+            expires_at = time.monotonic() + self.ttl
+            for currency, rate in zip(group, rates):
+                self._rates[currency] = (expires_at, rate)
+        self.updated_at = datetime.utcnow()
+
+    async def table(self, currencies: Iterable[str]) -> RateTable:
+        """Rate table covering the given currencies, refreshing expired rates."""
+        now = time.monotonic()
+        stale = sorted({
+            c for c in map(self._lookup, currencies)
+            if c != self.base and (c not in self._rates or self._rates[c][0] <= now)
+        })
+        if stale and self.brokers:
+            # Bridge rates are needed for the others, so refresh them too
+            bridges = {self._lookup(b) for b in self.bridges if self._cached(b) is None and self._fixed(b) is None}
+            stale = sorted((set(stale) | bridges) - {self.base})
+            await self._flights.do(tuple(stale), lambda: self._refresh(stale))
+
+        # Ticker rates win over the rate file, which fills the gaps; pegged
+        # currencies not in the file take their peg's rate
+        rates = dict(self._load_file())
+        rates.update({c: rate for c, (_, rate) in self._rates.items() if not math.isnan(rate)})
+        for currency, target in self.pegs.items():
+            if currency not in self._file_rates:
+                rate = 1.0 if target == self.base else rates.get(target)
+                if rate is not None:
+                    rates[currency] = rate
+        return RateTable(self.base, rates, self.updated_at)
+
+    def clear(self) -> None:
+        self._rates.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'base': self.base,
+            'ttl_seconds': self.ttl,
+            'cached_rates': sum(1 for _, rate in self._rates.values() if not math.isnan(rate)),
+            'unresolved': sorted(
+                c for c, (_, rate) in self._rates.items() if math.isnan(rate) and c not in self._file_rates
+            ),
+            'file_rates': len(self._file_rates),
+            'pegs': self.pegs,
+            'lookups': self.lookups,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -4,7 +4,7 @@ Mock broker implementation for testing
 from typing import List, Dict, Optional
 from datetime import datetime
 from .base import BrokerBase
-from ..models.trade import Trade
+from ..models.trade import Trade, TradeStatus
 
 class MockBroker(BrokerBase):
     """Mock broker that returns pre-generated data"""
@@ -30,7 +30,8 @@ class MockBroker(BrokerBase):
         self,
         symbol: Optional[str] = None,
         start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
     ) -> List[Trade]:
         """Return mock trades with optional filtering"""
         trades = self._trades
@@ -44,6 +45,9 @@ class MockBroker(BrokerBase):
         if end_time:
             trades = [t for t in trades if t.entry_time <= end_time]
         
+        if status:
+            trades = [t for t in trades if t.status == status]
+        
         return trades
     
     async def get_balance(self) -> Dict:
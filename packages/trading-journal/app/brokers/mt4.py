@@ -1,8 +1,48 @@
-import aiohttp
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from ..models.trade import Trade, TradeStatus, TradeType
 from .base import BrokerBase
+from .bridge_client import BridgeClient
+
+def trade_fields(trade_data: dict) -> dict:
+    """Map an MT4 trade record (bridge JSON or history file row) to typed Trade fields."""
+    trade_type = TradeType.BUY if trade_data['type'] == 'buy' else TradeType.SELL
+    trade_status = TradeStatus.CLOSED if trade_data.get('close_time') else TradeStatus.OPEN
+    
+    return dict(
+        id=f"mt4_{trade_data['ticket']}",
+        broker_id="mt4",
+        symbol=str(trade_data['symbol']),
+        type=trade_type,
+        status=trade_status,
+        quantity=float(trade_data['volume']),
+        entry_price=float(trade_data['open_price']),
+        exit_price=float(trade_data['close_price']) if trade_data.get('close_price') else None,
+        entry_time=datetime.fromtimestamp(trade_data['open_time']),
+        exit_time=datetime.fromtimestamp(trade_data['close_time']) if trade_data.get('close_time') else None,
+        commission=float(trade_data.get('commission', 0)),
+        swap=float(trade_data.get('swap', 0)),
+        pnl=float(trade_data.get('profit', 0)),
+        metadata={
+            "ticket": trade_data['ticket'],
+            "magic": trade_data.get('magic', 0),
+            "comment": trade_data.get('comment', '')
+        }
+    )
+
+def parse_trades(records: Iterable[dict]) -> List[Trade]:
+    """Map MT4 trade records to our Trade model in one batch."""
+    trades = Trade.trusted_batch(trade_fields(trade_data) for trade_data in records)
+    
+    for trade in trades:
+        if trade.exit_price:
+            trade.pnl, trade.pnl_percent = trade.calculate_pnl()
+    
+    return trades
+
+def parse_trade(trade_data: dict) -> Trade:
+    """Map a single MT4 trade record to our Trade model."""
+    return parse_trades([trade_data])[0]
 
 class MT4Broker(BrokerBase):
     """
@@ -10,31 +50,29 @@ class MT4Broker(BrokerBase):
     
     Note: MT4 doesn't have native Python API. This implementation assumes
     you have a REST API bridge (like MT4 REST API or custom bridge) running.
-    Alternatively, you can parse MT4 history files directly.
+    Alternatively, MT4FileBroker (mt4_files.py) reads MT4 history files directly.
+
+    All bridge calls go through a BridgeClient, which pools keep-alive
+    connections, applies per-request timeouts and retries with backoff.
     """
     
-    def __init__(self, api_url: str, account: int, password: str):
+    def __init__(self, api_url: str, account: int, password: str, client: Optional[BridgeClient] = None):
         super().__init__(str(account), password)
         self.api_url = api_url
         self.account = account
-        self.session = None
+        self.client = client or BridgeClient(api_url)
 
     async def connect(self) -> bool:
         """Establish connection to MT4 via REST API."""
         try:
-            self.session = aiohttp.ClientSession()
-            
             # Test connection with a simple request
-            async with self.session.get(
-                f"{self.api_url}/account",
-                params={"account": self.account}
-            ) as response:
-                if response.status == 200:
-                    self.connected = True
-                    return True
-                else:
-                    print(f"MT4 connection failed with status {response.status}")
-                    return False
+            status, _ = await self.client.get_json("/account", params={"account": self.account})
+            if status == 200:
+                self.connected = True
+                return True
+            else:
+                print(f"MT4 connection failed with status {status}")
+                return False
         except Exception as e:
             print(f"Failed to connect to MT4: {e}")
             self.connected = False
@@ -42,8 +80,7 @@ class MT4Broker(BrokerBase):
 
     async def disconnect(self) -> None:
         """Close connection to MT4."""
-        if self.session:
-            await self.session.close()
+        await self.client.close()
         self.connected = False
 
     async def get_trades(
@@ -68,40 +105,10 @@ class MT4Broker(BrokerBase):
             if symbol:
                 params["symbol"] = symbol
             
-            async with self.session.get(f"{self.api_url}/trades", params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
+            http_status, data = await self.client.get_json("/trades", params=params)
+            if http_status == 200:
+                trades = parse_trades(data.get('trades', []))
                     
-                    for trade_data in data.get('trades', []):
-                        trade_type = TradeType.BUY if trade_data['type'] == 'buy' else TradeType.SELL
-                        trade_status = TradeStatus.CLOSED if trade_data.get('close_time') else TradeStatus.OPEN
-                        
-                        trade = Trade(
-                            id=f"mt4_{trade_data['ticket']}",
-                            broker_id="mt4",
-                            symbol=trade_data['symbol'],
-                            type=trade_type,
-                            status=trade_status,
-                            quantity=float(trade_data['volume']),
-                            entry_price=float(trade_data['open_price']),
-                            exit_price=float(trade_data['close_price']) if trade_data.get('close_price') else None,
-                            entry_time=datetime.fromtimestamp(trade_data['open_time']),
-                            exit_time=datetime.fromtimestamp(trade_data['close_time']) if trade_data.get('close_time') else None,
-                            commission=float(trade_data.get('commission', 0)),
-                            swap=float(trade_data.get('swap', 0)),
-                            pnl=float(trade_data.get('profit', 0)),
-                            metadata={
-                                "ticket": trade_data['ticket'],
-                                "magic": trade_data.get('magic', 0),
-                                "comment": trade_data.get('comment', '')
-                            }
-                        )
-                        
-                        if trade.exit_price:
-                            trade.pnl, trade.pnl_percent = trade.calculate_pnl()
-                        
-                        trades.append(trade)
-                        
         except Exception as e:
             print(f"Error fetching trades from MT4: {e}")
             
@@ -113,25 +120,23 @@ class MT4Broker(BrokerBase):
             await self.connect()
             
         try:
-            async with self.session.get(
-                f"{self.api_url}/account",
-                params={"account": self.account}
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        "total": {
-                            "USD": float(data.get('balance', 0))
-                        },
-                        "free": {
-                            "USD": float(data.get('free_margin', 0))
-                        },
-                        "used": {
-                            "USD": float(data.get('margin', 0))
-                        },
-                        "equity": float(data.get('equity', 0)),
-                        "profit": float(data.get('profit', 0))
-                    }
+            status, data = await self.client.get_json("/account", params={"account": self.account})
+            if status == 200:
+                return {
+                    "total": {
+                        "USD": float(data.get('balance', 0))
+                    },
+                    "free": {
+                        "USD": float(data.get('free_margin', 0))
+                    },
+                    "used": {
+                        "USD": float(data.get('margin', 0))
+                    },
+                    "equity": float(data.get('equity', 0)),
+                    "profit": float(data.get('profit', 0))
+                }
+            print(f"MT4 account request failed with status {status}")
+            return {}
         except Exception as e:
             print(f"Error fetching balance from MT4: {e}")
             return {}
@@ -142,26 +147,24 @@ class MT4Broker(BrokerBase):
             await self.connect()
             
         try:
-            async with self.session.get(
-                f"{self.api_url}/positions",
-                params={"account": self.account}
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return [
-                        {
-                            'symbol': p['symbol'],
-                            'size': float(p['volume']),
-                            'entry_price': float(p['open_price']),
-                            'mark_price': float(p['current_price']),
-                            'unrealized_pnl': float(p['profit']),
-                            'side': 'long' if p['type'] == 'buy' else 'short',
-                            'swap': float(p.get('swap', 0)),
-                            'commission': float(p.get('commission', 0)),
-                            'ticket': p['ticket']
-                        }
-                        for p in data.get('positions', [])
-                    ]
+            status, data = await self.client.get_json("/positions", params={"account": self.account})
+            if status == 200:
+                return [
+                    {
+                        'symbol': p['symbol'],
+                        'size': float(p['volume']),
+                        'entry_price': float(p['open_price']),
+                        'mark_price': float(p['current_price']),
+                        'unrealized_pnl': float(p['profit']),
+                        'side': 'long' if p['type'] == 'buy' else 'short',
+                        'swap': float(p.get('swap', 0)),
+                        'commission': float(p.get('commission', 0)),
+                        'ticket': p['ticket']
+                    }
+                    for p in data.get('positions', [])
+                ]
+            print(f"MT4 positions request failed with status {status}")
+            return []
         except Exception as e:
             print(f"Error fetching positions from MT4: {e}")
             return []
@@ -172,20 +175,22 @@ class MT4Broker(BrokerBase):
             await self.connect()
             
         try:
-            async with self.session.get(
-                f"{self.api_url}/market/{symbol}",
-                params={"account": self.account}
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        'symbol': symbol,
-                        'last': float(data.get('last', 0)),
-                        'bid': float(data.get('bid', 0)),
-                        'ask': float(data.get('ask', 0)),
-                        'volume': float(data.get('volume', 0)),
-                        'timestamp': datetime.now()
-                    }
+            status, data = await self.client.get_json(
+                f"/market/{symbol}",
+                params={"account": self.account},
+                endpoint="/market"
+            )
+            if status == 200:
+                return {
+                    'symbol': symbol,
+                    'last': float(data.get('last', 0)),
+                    'bid': float(data.get('bid', 0)),
+                    'ask': float(data.get('ask', 0)),
+                    'volume': float(data.get('volume', 0)),
+                    'timestamp': datetime.now()
+                }
+            print(f"MT4 market request for {symbol} failed with status {status}")
+            return {'symbol': symbol}
         except Exception as e:
             print(f"Error fetching market data from MT4 for {symbol}: {e}")
             return {'symbol': symbol}
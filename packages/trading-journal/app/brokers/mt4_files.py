@@ -0,0 +1,354 @@
+"""
+File-based MT4 source: .hst bar files and exported account history
+"""
+import asyncio
+import csv
+import glob
+import mmap
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from ..models.trade import Trade, TradeStatus
+from .base import BrokerBase
+from .mt4 import parse_trades
+
+HST_HEADER_SIZE = 148
+
+# Bar layouts by .hst format version
+HST_BAR_DTYPES = {
+    400: np.dtype([
+        ('time', '<i4'), ('open', '<f8'), ('low', '<f8'), ('high', '<f8'),
+        ('close', '<f8'), ('volume', '<f8'),
+    ]),
+    401: np.dtype([
+        ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+        ('close', '<f8'), ('volume', '<i8'), ('spread', '<i4'), ('real_volume', '<i8'),
+    ]),
+}
+
+# Column aliases used by common MT4 history exports, mapped to bridge field names
+HISTORY_COLUMNS = {
+    'ticket': 'ticket', 'order': 'ticket',
+    'open_time': 'open_time', 'open time': 'open_time',
+    'type': 'type',
+    'volume': 'volume', 'size': 'volume', 'lots': 'volume',
+    'symbol': 'symbol', 'item': 'symbol',
+    'open_price': 'open_price', 'open price': 'open_price',
+    'close_time': 'close_time', 'close time': 'close_time',
+    'close_price': 'close_price', 'close price': 'close_price',
+    'commission': 'commission',
+    'swap': 'swap',
+    'profit': 'profit',
+    'magic': 'magic', 'magic number': 'magic',
+    'comment': 'comment',
+}
+
+TRADE_TYPES = ('buy', 'sell')
+
+
+def read_hst_header(path: str) -> Dict:
+    """Read the 148-byte header of an MT4 .hst file."""
+    with open(path, 'rb') as f:
+        header = np.frombuffer(f.read(HST_HEADER_SIZE), dtype=np.dtype([
+            ('version', '<i4'), ('copyright', 'S64'), ('symbol', 'S12'),
+            ('period', '<i4'), ('digits', '<i4'), ('timesign', '<i4'), ('last_sync', '<i4'),
+        ]), count=1)[0]
+    return {
+        'version': int(header['version']),
+        'symbol': header['symbol'].split(b'\0', 1)[0].decode('ascii', 'replace'),
+        'period': int(header['period']),
+        'digits': int(header['digits']),
+    }
+
+
+def iter_hst_bars(path: str, chunk_bars: int = 65536) -> Iterator[np.ndarray]:
+    """
+    Yield the bars of an .hst file as structured-array chunks.
+
+    The file is memory-mapped and each chunk is a copy of at most
+    ``chunk_bars`` records, so memory use does not grow with file size.
+    """
+    version = read_hst_header(path)['version']
+    dtype = HST_BAR_DTYPES.get(version)
+    if dtype is None:
+        raise ValueError(f"Unsupported .hst version {version} in {path}")
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        total = (len(mm) - HST_HEADER_SIZE) // dtype.itemsize
+        for start in range(0, total, chunk_bars):
+            count = min(chunk_bars, total - start)
+            offset = HST_HEADER_SIZE + start * dtype.itemsize
+            yield np.frombuffer(mm, dtype=dtype, count=count, offset=offset).copy()
+
+
+def last_hst_bar(path: str) -> Optional[Dict]:
+    """Return the most recent bar of an .hst file without reading the rest."""
+    version = read_hst_header(path)['version']
+    dtype = HST_BAR_DTYPES.get(version)
+    if dtype is None:
+        raise ValueError(f"Unsupported .hst version {version} in {path}")
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        total = (len(mm) - HST_HEADER_SIZE) // dtype.itemsize
+        if not total:
+            return None
+        offset = HST_HEADER_SIZE + (total - 1) * dtype.itemsize
+        # Copy so no view into the map outlives it
+        bar = np.frombuffer(mm, dtype=dtype, count=1, offset=offset).copy()[0]
+    return {name: bar[name].item() for name in dtype.names}
+
+
+def _parse_time(value: str) -> Optional[float]:
+    """Parse epoch seconds or MT4's 'YYYY.MM.DD HH:MM[:SS]' format."""
+    value = value.strip()
+    if not value or value in ('0', '1970.01.01 00:00', '1970.01.01 00:00:00'):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if len(value) in (16, 19) and value[4] == '.' and value[7] == '.':
+        # Fast path for MT4's fixed-width format; strptime is slow per row
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]) if len(value) == 19 else 0
+        ).timestamp()
+    for fmt in ('%Y.%m.%d %H:%M:%S', '%Y.%m.%d %H:%M', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised MT4 time '{value}'")
+
+
+def _iter_lines(path: str, encoding: str = 'utf-8') -> Iterator[str]:
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                yield line.decode(encoding, 'replace')
+
+
+def iter_history_rows(path: str, delimiter: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Yield rows of an exported MT4 account history (CSV/TSV) as dicts keyed
+    like the bridge's trade JSON. Balance, credit and pending-order rows
+    are yielded too; filter on ``type`` to keep only trades.
+    """
+    lines = _iter_lines(path)
+    header_line = next(lines, None)
+    if header_line is None:
+        return
+    header_line = header_line.lstrip('\ufeff')
+    if delimiter is None:
+        delimiter = max((',', ';', '\t'), key=header_line.count)
+
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    fields = [HISTORY_COLUMNS.get(name.strip().lower()) for name in header]
+
+    for values in csv.reader(lines, delimiter=delimiter):
+        if not values:
+            continue
+        row = {field: value for field, value in zip(fields, values) if field}
+        row['type'] = row.get('type', '').strip().lower()
+        row['open_time'] = _parse_time(row.get('open_time', ''))
+        row['close_time'] = _parse_time(row.get('close_time', ''))
+        for name in ('volume', 'open_price', 'close_price', 'commission', 'swap', 'profit'):
+            value = row.get(name, '').replace(' ', '')
+            row[name] = float(value) if value else 0.0
+        for name in ('ticket', 'magic'):
+            value = row.get(name, '').strip()
+            row[name] = int(value) if value.isdigit() else value
+        yield row
+
+
+def iter_history_trades(path: str, chunk_size: int = 1000) -> Iterator[Trade]:
+    """
+    Yield Trade objects from an exported MT4 account history. Rows are
+    converted in batches of ``chunk_size``, so memory stays bounded.
+    """
+    chunk = []
+    for row in iter_history_rows(path):
+        if row['type'] in TRADE_TYPES and row['open_time']:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield from parse_trades(chunk)
+                chunk = []
+    yield from parse_trades(chunk)
+
+
+class MT4FileBroker(BrokerBase):
+    """
+    MetaTrader 4 source that reads files instead of a REST bridge.
+
+    Trades come from an exported account history file; market data comes
+    from the terminal's .hst bar files. Both are streamed through
+    memory-mapped generators, so multi-GB histories import in constant
+    memory. File reads run in a worker thread, and the balance and open
+    trades of the last scan are reused until the history file changes.
+    """
+
+    def __init__(self, history_path: str, hst_dir: Optional[str] = None):
+        super().__init__('', '')
+        self.history_path = history_path
+        self.hst_dir = hst_dir
+        # ((mtime_ns, size), balance, open trades) of the last history scan
+        self._summary: Optional[Tuple[Tuple[int, int], float, List[Trade]]] = None
+
+    async def connect(self) -> bool:
+        """Check that the history file is readable."""
+        self.connected = os.path.isfile(self.history_path)
+        if not self.connected:
+            print(f"MT4 history file not found: {self.history_path}")
+        return self.connected
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    def iter_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> Iterator[Trade]:
+        """Stream matching trades from the history file."""
+        for trade in iter_history_trades(self.history_path):
+            if symbol and trade.symbol != symbol:
+                continue
+            if start_time and trade.entry_time < start_time:
+                continue
+            if end_time and trade.entry_time > end_time:
+                continue
+            if status and trade.status != status:
+                continue
+            yield trade
+
+    async def get_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> List[Trade]:
+        """Retrieve trades from the MT4 history file."""
+        try:
+            return await asyncio.to_thread(list, self.iter_trades(symbol, start_time, end_time, status))
+        except Exception as e:
+            print(f"Error reading MT4 history file: {e}")
+            return []
+
+    async def stream_trades(
+        self,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[Trade]:
+        """Stream matching trades straight from the history file."""
+        for count, trade in enumerate(self.iter_trades(symbol, start_time, end_time, status), 1):
+            yield trade
+            if count % chunk_size == 0:
+                # Let other requests run between chunks of file parsing
+                await asyncio.sleep(0)
+
+    def _scan_summary(self) -> Tuple[float, List[Trade]]:
+        """
+        Balance (deposits/withdrawals plus realised trade results) and open
+        trades of the history file, from one pass over it. Cached on the
+        file's mtime and size.
+        """
+        stat = os.stat(self.history_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._summary is not None and self._summary[0] == key:
+            return self._summary[1], self._summary[2]
+
+        balance = 0.0
+        open_rows = []
+        for row in iter_history_rows(self.history_path):
+            if row['type'] in ('balance', 'credit'):
+                balance += row['profit']
+            elif row['type'] in TRADE_TYPES:
+                if row['close_time']:
+                    balance += row['profit'] + row['commission'] + row['swap']
+                elif row['open_time']:
+                    open_rows.append(row)
+        open_trades = [t for t in parse_trades(open_rows) if t.status == TradeStatus.OPEN]
+        self._summary = (key, balance, open_trades)
+        return balance, open_trades
+
+    async def get_balance(self) -> dict:
+        """Balance from deposits/withdrawals plus realised trade results."""
+        try:
+            balance, _ = await asyncio.to_thread(self._scan_summary)
+            return {
+                "total": {"USD": balance},
+                "free": {"USD": balance},
+                "used": {"USD": 0.0}
+            }
+        except Exception as e:
+            print(f"Error reading MT4 history file: {e}")
+            return {}
+
+    def _positions(self) -> List[dict]:
+        positions = []
+        bars: Dict[str, Optional[Dict]] = {}
+        _, open_trades = self._scan_summary()
+        for trade in open_trades:
+            if trade.symbol not in bars:
+                bars[trade.symbol] = self._last_bar(trade.symbol)
+            bar = bars[trade.symbol]
+            mark_price = bar['close'] if bar else trade.entry_price
+            direction = 1 if trade.type.value == 'buy' else -1
+            positions.append({
+                'symbol': trade.symbol,
+                'size': trade.quantity,
+                'entry_price': trade.entry_price,
+                'mark_price': mark_price,
+                'unrealized_pnl': (mark_price - trade.entry_price) * trade.quantity * direction,
+                'side': 'long' if direction == 1 else 'short',
+                'swap': trade.swap,
+                'commission': trade.commission,
+                'ticket': trade.metadata.get('ticket')
+            })
+        return positions
+
+    async def get_positions(self) -> List[dict]:
+        """Open trades in the history file, marked at the latest bar close."""
+        try:
+            return await asyncio.to_thread(self._positions)
+        except Exception as e:
+            print(f"Error reading MT4 history file: {e}")
+            return []
+
+    def _hst_path(self, symbol: str) -> Optional[str]:
+        """Most recently written .hst file for a symbol, any timeframe."""
+        if not self.hst_dir:
+            return None
+        paths = glob.glob(os.path.join(self.hst_dir, f"{symbol}*.hst"))
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def _last_bar(self, symbol: str) -> Optional[Dict]:
+        path = self._hst_path(symbol)
+        return last_hst_bar(path) if path else None
+
+    async def get_market_data(self, symbol: str) -> dict:
+        """Latest bar for a symbol from the terminal's .hst files."""
+        try:
+            bar = await asyncio.to_thread(self._last_bar, symbol)
+            if bar is None:
+                return {'symbol': symbol}
+            return {
+                'symbol': symbol,
+                'last': bar['close'],
+                'bid': bar['close'],
+                'ask': bar['close'],
+                'volume': float(bar['volume']),
+                'timestamp': datetime.fromtimestamp(bar['time'])
+            }
+        except Exception as e:
+            print(f"Error reading MT4 bars for {symbol}: {e}")
+            return {'symbol': symbol}
@@ -1,8 +1,16 @@
+import asyncio
+import functools
 import MetaTrader5 as mt5
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 from ..models.trade import Trade, TradeStatus, TradeType
 from .base import BrokerBase
+from .mt5_deals import deals_to_array, group_positions
+
+# The MetaTrader5 terminal API is blocking and not thread-safe, so every call
+# runs on this single worker thread and queues behind the previous one.
+_mt5_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
 
 class MT5Broker(BrokerBase):
     """MetaTrader 5 broker implementation."""
@@ -14,8 +22,16 @@ class MT5Broker(BrokerBase):
         self.password = password
         self.server = server
 
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking MT5 call on the dedicated MT5 thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_mt5_executor, functools.partial(fn, *args, **kwargs))
+
     async def connect(self) -> bool:
         """Establish connection to MT5."""
+        return await self._run(self._connect_sync)
+
+    def _connect_sync(self) -> bool:
         try:
             if not mt5.initialize():
                 print(f"MT5 initialize() failed, error code = {mt5.last_error()}")
@@ -37,7 +53,7 @@ class MT5Broker(BrokerBase):
     async def disconnect(self) -> None:
         """Close connection to MT5."""
         if self.connected:
-            mt5.shutdown()
+            await self._run(mt5.shutdown)
         self.connected = False
 
     async def get_trades(
@@ -51,6 +67,14 @@ class MT5Broker(BrokerBase):
         if not self.connected:
             await self.connect()
 
+        return await self._run(self._get_trades_sync, symbol, start_time, end_time)
+
+    def _get_trades_sync(
+        self,
+        symbol: Optional[str],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime]
+    ) -> List[Trade]:
         trades = []
         try:
             # Get deals from history
@@ -63,65 +87,50 @@ class MT5Broker(BrokerBase):
                 print(f"No deals found, error code = {mt5.last_error()}")
                 return trades
             
-            # Group deals by position to create trades
-            position_deals = {}
-            for deal in deals:
-                if deal.entry == mt5.DEAL_ENTRY_IN or deal.entry == mt5.DEAL_ENTRY_OUT:
-                    pos_id = deal.position_id
-                    if pos_id not in position_deals:
-                        position_deals[pos_id] = []
-                    position_deals[pos_id].append(deal)
+            # Group deals by position in bulk, then build Trade objects from the columns
+            positions = group_positions(deals_to_array(deals), mt5.DEAL_ENTRY_IN, mt5.DEAL_ENTRY_OUT)
+            columns = {name: column.tolist() for name, column in positions.items()}
             
-            # Convert position deals to Trade objects
-            for pos_id, deal_list in position_deals.items():
-                if not deal_list:
-                    continue
-                
-                # Sort by time
-                deal_list.sort(key=lambda x: x.time)
-                
-                entry_deal = deal_list[0]
-                exit_deal = deal_list[-1] if len(deal_list) > 1 else None
+            rows = []
+            for k, pos_id in enumerate(columns['position_id']):
+                entry_deal = deals[columns['entry_index'][k]]
                 
                 # Filter by symbol if specified
                 if symbol and entry_deal.symbol != symbol:
                     continue
                 
-                trade_type = TradeType.BUY if entry_deal.type == mt5.DEAL_TYPE_BUY else TradeType.SELL
-                trade_status = TradeStatus.CLOSED if exit_deal else TradeStatus.OPEN
-                
-                # Calculate PnL
-                pnl = sum([d.profit for d in deal_list])
-                commission = sum([d.commission for d in deal_list])
-                swap = sum([d.swap for d in deal_list])
+                trade_type = TradeType.BUY if columns['type'][k] == mt5.DEAL_TYPE_BUY else TradeType.SELL
+                has_exit = columns['has_exit'][k]
+                trade_status = TradeStatus.CLOSED if has_exit else TradeStatus.OPEN
                 
-                trade = Trade(
+                rows.append(dict(
                     id=f"mt5_{pos_id}",
                     broker_id="mt5",
                     symbol=entry_deal.symbol,
                     type=trade_type,
                     status=trade_status,
-                    quantity=entry_deal.volume,
-                    entry_price=entry_deal.price,
-                    exit_price=exit_deal.price if exit_deal else None,
-                    entry_time=datetime.fromtimestamp(entry_deal.time),
-                    exit_time=datetime.fromtimestamp(exit_deal.time) if exit_deal else None,
-                    commission=commission,
-                    swap=swap,
-                    pnl=pnl,
+                    quantity=columns['volume'][k],
+                    entry_price=columns['entry_price'][k],
+                    exit_price=columns['exit_price'][k] if has_exit else None,
+                    entry_time=datetime.fromtimestamp(columns['entry_time'][k]),
+                    exit_time=datetime.fromtimestamp(columns['exit_time'][k]) if has_exit else None,
+                    commission=columns['commission'][k],
+                    swap=columns['swap'][k],
+                    pnl=columns['profit'][k],
                     metadata={
                         "position_id": pos_id,
                         "magic": entry_deal.magic,
                         "comment": entry_deal.comment
                     }
-                )
-                
+                ))
+            
+            # Fields are already typed by the NumPy columns, so skip re-validation
+            trades = Trade.trusted_batch(rows)
+            for trade in trades:
                 # Calculate PnL percentage
                 if trade.exit_price:
                     trade.pnl, trade.pnl_percent = trade.calculate_pnl()
-                
-                trades.append(trade)
-                
+            
         except Exception as e:
             print(f"Error fetching trades from MT5: {e}")
             
@@ -131,7 +140,10 @@ class MT5Broker(BrokerBase):
         """Get account balance from MT5."""
         if not self.connected:
             await self.connect()
-            
+
+        return await self._run(self._get_balance_sync)
+
+    def _get_balance_sync(self) -> dict:
         try:
             account_info = mt5.account_info()
             if account_info is None:
@@ -160,7 +172,10 @@ class MT5Broker(BrokerBase):
         """Get current open positions from MT5."""
         if not self.connected:
             await self.connect()
-            
+
+        return await self._run(self._get_positions_sync)
+
+    def _get_positions_sync(self) -> List[dict]:
         try:
             positions = mt5.positions_get()
             if positions is None:
@@ -190,7 +205,20 @@ class MT5Broker(BrokerBase):
         """Get current market data for a symbol from MT5."""
         if not self.connected:
             await self.connect()
-            
+
+        return await self._run(self._get_market_data_sync, symbol)
+
+    async def get_market_data_batch(self, symbols: List[str]) -> Dict[str, dict]:
+        """Get market data for many symbols in one hop to the MT5 thread."""
+        if not self.connected:
+            await self.connect()
+
+        return await self._run(self._get_market_data_batch_sync, symbols)
+
+    def _get_market_data_batch_sync(self, symbols: List[str]) -> Dict[str, dict]:
+        return {symbol: self._get_market_data_sync(symbol) for symbol in symbols}
+
+    def _get_market_data_sync(self, symbol: str) -> dict:
         try:
             tick = mt5.symbol_info_tick(symbol)
             if tick is None:
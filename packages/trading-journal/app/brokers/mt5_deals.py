@@ -0,0 +1,91 @@
+"""
+Columnar reconstruction of MT5 positions from history deals
+"""
+from typing import Dict, Sequence
+import numpy as np
+
+DEAL_DTYPE = np.dtype([
+    ('position_id', np.int64),
+    ('time', np.int64),
+    ('entry', np.int64),
+    ('type', np.int64),
+    ('volume', np.float64),
+    ('price', np.float64),
+    ('profit', np.float64),
+    ('commission', np.float64),
+    ('swap', np.float64),
+])
+
+POSITION_COLUMNS = (
+    'position_id', 'entry_index', 'exit_index', 'has_exit', 'type', 'volume',
+    'entry_price', 'exit_price', 'entry_time', 'exit_time', 'profit', 'commission', 'swap'
+)
+
+
+def deals_to_array(deals: Sequence) -> np.ndarray:
+    """Copy the numeric fields of MT5 TradeDeal tuples into a structured array."""
+    return np.fromiter(
+        (
+            (d.position_id, d.time, d.entry, d.type, d.volume, d.price, d.profit, d.commission, d.swap)
+            for d in deals
+        ),
+        dtype=DEAL_DTYPE,
+        count=len(deals)
+    )
+
+
+def group_positions(deals: np.ndarray, entry_in: int, entry_out: int) -> Dict[str, np.ndarray]:
+    """
+    Group entry/exit deals by position_id.
+
+    Within a position, deals are ordered by time (ties keep their original
+    order); the first deal is the entry and, when there is more than one,
+    the last is the exit. Profit, commission and swap are summed over all of
+    a position's deals. Positions come back in order of their first deal,
+    and ``entry_index``/``exit_index`` point into the input array
+    (``exit_index`` is -1 when there is no exit).
+    """
+    index = np.flatnonzero((deals['entry'] == entry_in) | (deals['entry'] == entry_out))
+    if not len(index):
+        return {name: np.empty(0) for name in POSITION_COLUMNS}
+
+    subset = deals[index]
+    # lexsort is stable: primary key position_id, secondary key time
+    order = np.lexsort((subset['time'], subset['position_id']))
+    ordered = subset[order]
+    source = index[order]
+
+    position_ids = ordered['position_id']
+    starts = np.flatnonzero(np.r_[True, position_ids[1:] != position_ids[:-1]])
+    ends = np.r_[starts[1:], len(ordered)] - 1
+    has_exit = ends > starts
+    exit_rows = np.where(has_exit, ends, starts)
+
+    # bincount adds weights strictly in input (time) order, so the sums match
+    # a sequential Python sum bit for bit; add.reduceat sums pairwise
+    group_ids = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    sums = {
+        name: np.bincount(group_ids, weights=ordered[name], minlength=len(starts))
+        for name in ('profit', 'commission', 'swap')
+    }
+
+    columns = {
+        'position_id': position_ids[starts],
+        'entry_index': source[starts],
+        'exit_index': np.where(has_exit, source[ends], -1),
+        'has_exit': has_exit,
+        'type': ordered['type'][starts],
+        'volume': ordered['volume'][starts],
+        'entry_price': ordered['price'][starts],
+        'exit_price': ordered['price'][exit_rows],
+        'entry_time': ordered['time'][starts],
+        'exit_time': ordered['time'][exit_rows],
+        'profit': sums['profit'],
+        'commission': sums['commission'],
+        'swap': sums['swap'],
+    }
+
+    # Emit positions in order of first appearance, like a dict keyed by position_id
+    first_seen = np.minimum.reduceat(order, starts)
+    emit = np.argsort(first_seen, kind='stable')
+    return {name: column[emit] for name, column in columns.items()}
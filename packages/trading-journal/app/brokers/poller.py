@@ -0,0 +1,297 @@
+"""
+Background broker polling into an in-memory snapshot
+"""
+import asyncio
+import copy
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from ..analytics.online_metrics import OnlineRiskMetrics
+from ..analytics.rollups import PnLRollups
+from ..analytics.trade_frame import TradeFrame
+from ..models.trade import Trade
+from .base import BrokerBase
+from .cache import CachedBroker
+from .fanout import DEFAULT_INCLUDE, FanOutResult
+
+DEFAULT_INTERVALS = {'trades': 60.0, 'positions': 10.0, 'balance': 30.0}
+
+
+class BrokerPoller:
+    """
+    Refreshes trades, positions and balances of every broker on its own
+    interval and keeps the latest values in memory.
+
+    Each (broker, dataset) pair runs as a separate task. Intervals get
+    +/- ``jitter`` (a fraction) so brokers are not hit in lockstep. After a
+    failure the delay doubles up to ``max_backoff`` seconds. A dataset
+    older than ``stale_factor`` intervals is treated as missing.
+
+    Each trades refresh also builds the broker's TradeFrame, so analytics
+    reuse it until the next refresh, and feeds trades that closed since the
+    last refresh into the broker's OnlineRiskMetrics and PnLRollups. Both
+    always cover exactly the closed trades of the current snapshot: a trade
+    that closed before ones already counted, or a counted trade that is no
+    longer in the snapshot, rebuilds them from the snapshot.
+
+    Trades are polled from ``history`` before the first poll on, or over
+    the broker's default window when ``history`` is None. Each broker's
+    snapshot records the earliest time it covers (the history start, or
+    else its oldest trade), and is not ready for queries starting earlier.
+    """
+
+    def __init__(
+        self,
+        brokers: Dict[str, BrokerBase],
+        intervals: Optional[Dict[str, float]] = None,
+        jitter: float = 0.1,
+        max_backoff: float = 300.0,
+        stale_factor: float = 5.0,
+        history: Optional[timedelta] = None
+    ):
+        self.brokers = brokers
+        self.intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.stale_factor = stale_factor
+        self.history = history
+        self.since: Optional[datetime] = None
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._frames: Dict[str, TradeFrame] = {}
+        self._online: Dict[str, OnlineRiskMetrics] = {}
+        self._rollups: Dict[str, PnLRollups] = {}
+        self._counted: Dict[str, Set[str]] = {}
+        self._covered: Dict[str, Optional[datetime]] = {}
+        self._updated: Dict[str, Dict[str, float]] = {}
+        self._errors: Dict[str, Dict[str, str]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def _fetch(self, broker_id: str, dataset: str) -> Any:
+        broker = self.brokers[broker_id]
+        # Bypass the snapshot cache so each poll sees current broker data
+        if isinstance(broker, CachedBroker):
+            broker.cache.invalidate(broker_id, dataset)
+        if dataset == 'trades':
+            if self.history is None:
+                return await broker.get_trades()
+            if self.since is None:
+                self.since = datetime.now() - self.history
+            return await broker.get_trades(start_time=self.since)
+        if dataset == 'positions':
+            return await broker.get_positions()
+        return await broker.get_balance()
+
+    async def poll_once(self, broker_id: str, dataset: str) -> bool:
+        """Refresh one dataset of one broker. Returns False on failure."""
+        try:
+            value = await self._fetch(broker_id, dataset)
+        except Exception as e:
+            self._errors.setdefault(broker_id, {})[dataset] = str(e)
+            print(f"Error polling {dataset} from {broker_id}: {e}")
+            return False
+        if dataset == 'trades':
+            frame, online, rollups, counted = await asyncio.to_thread(
+                self._index_trades, value, broker_id, self._online.get(broker_id),
+                self._rollups.get(broker_id), self._counted.get(broker_id, set())
+            )
+            self._frames[broker_id] = frame
+            self._online[broker_id] = online
+            self._rollups[broker_id] = rollups
+            self._counted[broker_id] = counted
+            self._covered[broker_id] = self.since if self.history is not None else min(
+                (t.entry_time for t in value), default=None
+            )
+        self._data.setdefault(broker_id, {})[dataset] = value
+        self._updated.setdefault(broker_id, {})[dataset] = time.monotonic()
+        self._errors.get(broker_id, {}).pop(dataset, None)
+        return True
+
+    @staticmethod
+    def _index_trades(
+        trades: List[Trade],
+        broker_id: str,
+        online: Optional[OnlineRiskMetrics],
+        rollups: Optional[PnLRollups],
+        counted: Set[str]
+    ) -> Tuple[TradeFrame, OnlineRiskMetrics, PnLRollups, Set[str]]:
+        """
+        Build the broker's frame and count newly closed trades into copies of
+        its online metrics, rollups and counted ids, so readers never see a
+        half update.
+        """
+        frame = TradeFrame.from_trades(trades, broker_id)
+        closed = np.flatnonzero(frame.closed)
+        rows = np.array([i for i in closed.tolist() if trades[i].id not in counted], dtype=np.intp)
+        exit_times = frame.exit_time[rows]
+        exit_times = exit_times[~np.isnat(exit_times)]
+        # Every counted trade is still closed in the snapshot unless some
+        # left it (the new ones make up the rest)
+        dropped = len(closed) - len(rows) != len(counted)
+        if (online is None or rollups is None or dropped
+                or (len(exit_times) and not online.in_order(exit_times.min()))):
+            online = OnlineRiskMetrics()
+            rollups = PnLRollups()
+            counted = set()
+            rows = closed
+        elif len(rows):
+            online = copy.deepcopy(online)
+            rollups = copy.deepcopy(rollups)
+            counted = set(counted)
+        online.add_frame(frame, rows)
+        rollups.add_frame(frame, rows)
+        counted.update(trades[i].id for i in rows.tolist())
+        return frame, online, rollups, counted
+
+    async def _run(self, broker_id: str, dataset: str) -> None:
+        interval = self.intervals[dataset]
+        failures = 0
+        while broker_id in self.brokers:
+            ok = await self.poll_once(broker_id, dataset)
+            failures = 0 if ok else failures + 1
+            delay = min(self.max_backoff, interval * (2 ** failures))
+            await asyncio.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def start(self) -> None:
+        """Start one polling task per broker and dataset."""
+        for broker_id in self.brokers:
+            for dataset in DEFAULT_INCLUDE:
+                self._tasks.append(asyncio.create_task(self._run(broker_id, dataset)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def refresh(self) -> None:
+        """Drop the snapshot and poll everything once, e.g. after brokers change."""
+        self._data.clear()
+        self._frames.clear()
+        self._online.clear()
+        self._rollups.clear()
+        self._counted.clear()
+        self._covered.clear()
+        self._updated.clear()
+        self._errors.clear()
+        await asyncio.gather(*(
+            self.poll_once(broker_id, dataset)
+            for broker_id in self.brokers
+            for dataset in DEFAULT_INCLUDE
+        ))
+
+    def age(self, broker_id: str, dataset: str) -> Optional[float]:
+        """Seconds since a dataset was last refreshed, or None if never."""
+        updated = self._updated.get(broker_id, {}).get(dataset)
+        return time.monotonic() - updated if updated is not None else None
+
+    def covers(self, broker_id: str, start_time: Optional[datetime]) -> bool:
+        """True if the broker's trades snapshot reaches back to start_time."""
+        if start_time is None:
+            return True
+        covered = self._covered.get(broker_id)
+        return covered is not None and start_time >= covered
+
+    def ready(self, include: Sequence[str] = DEFAULT_INCLUDE, start_time: Optional[datetime] = None) -> bool:
+        """
+        True if every broker has a fresh value for every requested dataset,
+        and its trades snapshot covers everything from start_time on.
+        """
+        for broker_id in self.brokers:
+            if 'trades' in include and not self.covers(broker_id, start_time):
+                return False
+            for dataset in include:
+                age = self.age(broker_id, dataset)
+                if age is None or age > self.intervals[dataset] * self.stale_factor:
+                    return False
+        return True
+
+    def read(
+        self,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> FanOutResult:
+        """Serve the current snapshot in the same shape as a live fan-out."""
+        result = FanOutResult()
+        result.source = 'snapshot'
+        for broker_id in self.brokers:
+            data = self._data.get(broker_id, {})
+            if 'trades' in include:
+                trades = data.get('trades', [])
+                if start_time:
+                    trades = [t for t in trades if t.entry_time >= start_time]
+                if end_time:
+                    trades = [t for t in trades if t.entry_time <= end_time]
+                result.trades[broker_id] = trades
+                if broker_id in self._frames:
+                    result.frames[broker_id] = self._frames[broker_id].between(start_time, end_time)
+            if 'positions' in include:
+                result.positions[broker_id] = data.get('positions', [])
+            if 'balance' in include:
+                result.balances[broker_id] = data.get('balance', {})
+
+            errors = [f"{k}: {v}" for k, v in self._errors.get(broker_id, {}).items() if k in include]
+            if errors:
+                result.errors[broker_id] = '; '.join(errors)
+            result.timings[broker_id] = 0.0
+            ages = [self.age(broker_id, dataset) or 0.0 for dataset in include]
+            result.ages[broker_id] = max(ages) if ages else 0.0
+        return result
+
+    def status(self) -> Dict:
+        status = {}
+        for broker_id in self.brokers:
+            status[broker_id] = {
+                dataset: {
+                    'age_seconds': self.age(broker_id, dataset),
+                    'interval_seconds': self.intervals[dataset],
+                    'error': self._errors.get(broker_id, {}).get(dataset)
+                }
+                for dataset in DEFAULT_INCLUDE
+            }
+            covered = self._covered.get(broker_id)
+            status[broker_id]['covered_from'] = covered.isoformat() if covered else None
+        return status
+
+    def online_metrics(self) -> Dict[str, Dict]:
+        """Current incrementally maintained risk metrics of each broker."""
+        return {broker_id: online.metrics() for broker_id, online in self._online.items()}
+
+    def rollups(self) -> List[PnLRollups]:
+        """
+        PnL buckets of every broker. They hold exactly the closed trades of
+        the snapshot, so a timeline read from them matches one built from
+        the snapshot's frames.
+        """
+        return [self._rollups[broker_id] for broker_id in self.brokers if broker_id in self._rollups]
+
+    def checkpoint(self) -> Dict:
+        """Online metric and rollup state of every broker, as plain JSON types."""
+        return {
+            broker_id: {
+                'metrics': online.to_dict(),
+                'rollups': self._rollups[broker_id].to_dict(),
+                'trade_ids': sorted(self._counted.get(broker_id, ())),
+                'since': self.since.isoformat() if self.since else None
+            }
+            for broker_id, online in self._online.items()
+            if broker_id in self._rollups
+        }
+
+    def restore(self, checkpoint: Dict) -> None:
+        """
+        Resume online metrics and rollups from a checkpoint; later polls only
+        add new trades. The history start is kept too, so the snapshot
+        covers the same trades as before the restart.
+        """
+        for broker_id, state in checkpoint.items():
+            # Older checkpoints without rollups are rebuilt on the first poll
+            if broker_id in self.brokers and 'rollups' in state:
+                if self.history is not None and state.get('since'):
+                    since = min(datetime.fromisoformat(state['since']), datetime.now() - self.history)
+                    self.since = min(self.since, since) if self.since else since
+                self._online[broker_id] = OnlineRiskMetrics.from_dict(state['metrics'])
+                self._rollups[broker_id] = PnLRollups.from_dict(state['rollups'])
+                self._counted[broker_id] = set(state['trade_ids'])
@@ -0,0 +1,52 @@
+"""
+Single-flight coalescing of identical concurrent broker calls
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    Callers that arrive while a call for the same key is still in flight
+    await that call's result instead of starting their own. The shared call
+    is shielded, so a caller timing out or being cancelled does not abort it
+    for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _consume(task: asyncio.Future) -> None:
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of fn(), sharing it with concurrent calls for key."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def done(t: asyncio.Future, key: Hashable = key) -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                self._consume(t)
+
+            task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._inflight),
+            'calls': self.calls,
+            'coalesced': self.coalesced
+        }
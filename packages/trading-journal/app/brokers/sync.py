@@ -0,0 +1,400 @@
+"""
+Incremental trade sync backed by a local SQLite trade store
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from ..models.trade import Trade, TradeStatus, TradeType
+from ..pagination import TradeKey, trade_key
+from .base import BrokerBase
+from .singleflight import SingleFlight
+
+_DATETIME_FIELDS = ('entry_time', 'exit_time', 'created_at', 'updated_at')
+
+
+def _stored_fields(data: str) -> Dict[str, Any]:
+    """Typed Trade fields of a stored row, for Trade.trusted_batch."""
+    fields = json.loads(data)
+    fields['type'] = TradeType(fields['type'])
+    fields['status'] = TradeStatus(fields['status'])
+    for name in _DATETIME_FIELDS:
+        if fields.get(name) is not None:
+            fields[name] = datetime.fromisoformat(fields[name])
+    return fields
+
+
+class TradeStore:
+    """Local store of synced trades and per-broker sync cursors."""
+
+    def __init__(self, path: str = "trade_sync.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trades (
+                broker_id TEXT NOT NULL,
+                id TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                status TEXT NOT NULL,
+                entry_time REAL NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (broker_id, id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_trades_page ON trades (broker_id, entry_time, id);
+            CREATE TABLE IF NOT EXISTS sync_cursors (
+                broker_id TEXT PRIMARY KEY,
+                cursor TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sync_coverage (
+                broker_id TEXT PRIMARY KEY,
+                covered_from REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def upsert_trades(self, broker_id: str, trades: List[Trade]) -> int:
+        """Insert new trades and replace changed ones. Returns rows written."""
+        rows = [
+            (broker_id, t.id, t.symbol, t.status.value, t.entry_time.timestamp(), t.model_dump_json())
+            for t in trades
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO trades (broker_id, id, symbol, status, entry_time, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    @staticmethod
+    def _filters(
+        broker_id: str,
+        symbol: Optional[str],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        status: Optional[TradeStatus]
+    ) -> Tuple[str, list]:
+        sql = "broker_id = ?"
+        params: list = [broker_id]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol)
+        if start_time:
+            sql += " AND entry_time >= ?"
+            params.append(start_time.timestamp())
+        if end_time:
+            sql += " AND entry_time <= ?"
+            params.append(end_time.timestamp())
+        if status:
+            sql += " AND status = ?"
+            params.append(status.value)
+        return sql, params
+
+    def query(
+        self,
+        broker_id: str,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> List[Trade]:
+        """Return stored trades for a broker ordered by entry time."""
+        where, params = self._filters(broker_id, symbol, start_time, end_time, status)
+        sql = f"SELECT data FROM trades WHERE {where} ORDER BY entry_time, id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return Trade.trusted_batch(_stored_fields(row[0]) for row in rows)
+
+    def query_page(
+        self,
+        broker_id: str,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        after: Optional[TradeKey] = None,
+        limit: int = 1000
+    ) -> List[Trade]:
+        """
+        Up to ``limit`` stored trades ordered by (entry_time, id), starting
+        after the ``after`` key. Seeks on the index, so deep pages cost the
+        same as the first.
+        """
+        where, params = self._filters(broker_id, symbol, start_time, end_time, status)
+        if after is not None:
+            after_time = after[0].timestamp()
+            where += " AND (entry_time > ? OR (entry_time = ? AND id > ?))"
+            params += [after_time, after_time, after[1]]
+        sql = f"SELECT data FROM trades WHERE {where} ORDER BY entry_time, id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return Trade.trusted_batch(_stored_fields(row[0]) for row in rows)
+
+    def iter_query(
+        self,
+        broker_id: str,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Trade]]:
+        """
+        Like ``query``, but yields pages of at most ``batch_size`` trades.
+        The lock is not held between pages.
+        """
+        after = None
+        while True:
+            batch = self.query_page(broker_id, symbol, start_time, end_time, status, after, batch_size)
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            after = trade_key(batch[-1])
+
+    def earliest_open_entry(self, broker_id: str) -> Optional[float]:
+        """Entry time of the oldest trade still stored as open."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(entry_time) FROM trades WHERE broker_id = ? AND status = ?",
+                (broker_id, TradeStatus.OPEN.value)
+            ).fetchone()
+        return row[0] if row else None
+
+    def earliest_entry(self, broker_id: str) -> Optional[float]:
+        """Entry time of the oldest stored trade."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(entry_time) FROM trades WHERE broker_id = ?", (broker_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_coverage(self, broker_id: str) -> Optional[float]:
+        """Start (epoch seconds) of the history the store holds for a broker."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT covered_from FROM sync_coverage WHERE broker_id = ?", (broker_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def extend_coverage(self, broker_id: str, covered_from: float) -> None:
+        """Move the start of a broker's stored history back; never forward."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_coverage (broker_id, covered_from) VALUES (?, ?) "
+                "ON CONFLICT (broker_id) DO UPDATE SET covered_from = MIN(covered_from, excluded.covered_from)",
+                (broker_id, covered_from)
+            )
+            self._conn.commit()
+
+    def count(self, broker_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM trades WHERE broker_id = ?", (broker_id,)
+            ).fetchone()
+        return row[0]
+
+    def get_cursor(self, broker_id: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor FROM sync_cursors WHERE broker_id = ?", (broker_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set_cursor(self, broker_id: str, cursor: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_cursors (broker_id, cursor) VALUES (?, ?)",
+                (broker_id, json.dumps(cursor))
+            )
+            self._conn.commit()
+
+    def clear(self, broker_id: Optional[str] = None) -> None:
+        """Delete stored trades and cursors for one broker or for all of them."""
+        with self._lock:
+            if broker_id is None:
+                self._conn.execute("DELETE FROM trades")
+                self._conn.execute("DELETE FROM sync_cursors")
+                self._conn.execute("DELETE FROM sync_coverage")
+            else:
+                self._conn.execute("DELETE FROM trades WHERE broker_id = ?", (broker_id,))
+                self._conn.execute("DELETE FROM sync_cursors WHERE broker_id = ?", (broker_id,))
+                self._conn.execute("DELETE FROM sync_coverage WHERE broker_id = ?", (broker_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TradeSync:
+    """
+    Pulls only new or changed trades from each broker and merges them into
+    a TradeStore.
+
+    The per-broker cursor holds a high-watermark (``since``, epoch seconds):
+    the entry time of the oldest trade that can still change (an open
+    trade), or else of the newest trade seen, minus a small overlap. Brokers
+    can keep extra state in the cursor, e.g. Binance ``from_id`` per symbol.
+
+    The first sync of a broker fetches the last ``history`` of trades, and
+    the store records how far back it holds. A query starting earlier first
+    backfills the missing range from the broker. Store I/O runs in a worker
+    thread so it never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        store: TradeStore,
+        overlap: timedelta = timedelta(minutes=5),
+        history: timedelta = timedelta(days=30)
+    ):
+        self.store = store
+        self.overlap = overlap
+        self.history = history
+        self._flights = SingleFlight()
+
+    def _advance(self, broker_id: str, cursor: Dict, trades: List[Trade]) -> Dict:
+        """Move the high-watermark past the trades that can no longer change."""
+        cursor = dict(cursor)
+        if trades:
+            newest = max(trades, key=lambda t: (t.entry_time, t.id))
+            if newest.entry_time.timestamp() >= cursor.get('last_time', 0):
+                cursor['last_time'] = newest.entry_time.timestamp()
+                cursor['last_id'] = newest.id
+
+        watermark = cursor.get('last_time')
+        earliest_open = self.store.earliest_open_entry(broker_id)
+        if earliest_open is not None:
+            watermark = min(watermark, earliest_open) if watermark is not None else earliest_open
+        if watermark is not None:
+            cursor['since'] = watermark - self.overlap.total_seconds()
+        cursor['synced_at'] = datetime.utcnow().isoformat()
+        return cursor
+
+    def _load_cursor(self, broker_id: str) -> Dict:
+        """The broker's cursor; a first sync starts ``history`` back and records that as covered."""
+        cursor = self.store.get_cursor(broker_id)
+        if not cursor:
+            since = (datetime.now() - self.history).timestamp()
+            cursor = {'since': since}
+            self.store.extend_coverage(broker_id, since)
+        elif self.store.get_coverage(broker_id) is None:
+            # Stores synced before coverage was recorded hold at least
+            # everything from their oldest trade on
+            covered_from = self.store.earliest_entry(broker_id)
+            if covered_from is None:
+                covered_from = cursor.get('since', datetime.now().timestamp())
+            self.store.extend_coverage(broker_id, covered_from)
+        return cursor
+
+    def _save(self, broker_id: str, cursor: Dict, trades: List[Trade]) -> Tuple[int, Dict]:
+        written = self.store.upsert_trades(broker_id, trades)
+        cursor = self._advance(broker_id, cursor, trades)
+        self.store.set_cursor(broker_id, cursor)
+        return written, cursor
+
+    async def _sync(self, broker_id: str, broker: BrokerBase) -> Dict:
+        cursor = await asyncio.to_thread(self._load_cursor, broker_id)
+        trades, cursor = await broker.get_trades_since(cursor)
+        written, cursor = await asyncio.to_thread(self._save, broker_id, cursor, trades)
+        return {'broker_id': broker_id, 'fetched': len(trades), 'written': written, 'cursor': cursor}
+
+    async def sync(self, broker_id: str, broker: BrokerBase) -> Dict:
+        """Run one incremental sync; concurrent syncs of a broker are coalesced."""
+        return await self._flights.do(broker_id, lambda: self._sync(broker_id, broker))
+
+    async def _backfill(self, broker_id: str, broker: BrokerBase, start: float) -> None:
+        covered_from = await asyncio.to_thread(self.store.get_coverage, broker_id)
+        if covered_from is None or start >= covered_from:
+            return
+        trades = await broker.get_trades(
+            start_time=datetime.fromtimestamp(start),
+            end_time=datetime.fromtimestamp(covered_from + self.overlap.total_seconds())
+        )
+        await asyncio.to_thread(self.store.upsert_trades, broker_id, trades)
+        await asyncio.to_thread(self.store.extend_coverage, broker_id, start)
+
+    async def _prepare(self, broker_id: str, broker: BrokerBase, start_time: Optional[datetime]) -> None:
+        """Sync new activity and backfill history the store lacks before start_time."""
+        await self.sync(broker_id, broker)
+        if start_time is not None:
+            start = start_time.timestamp()
+            await self._flights.do(
+                ('backfill', broker_id, start), lambda: self._backfill(broker_id, broker, start)
+            )
+
+    async def get_trades(
+        self,
+        broker_id: str,
+        broker: BrokerBase,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None
+    ) -> List[Trade]:
+        """Sync new activity, then answer the query from the local store."""
+        await self._prepare(broker_id, broker, start_time)
+        return await asyncio.to_thread(self.store.query, broker_id, symbol, start_time, end_time, status)
+
+    async def get_trades_page(
+        self,
+        broker_id: str,
+        broker: BrokerBase,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        after: Optional[TradeKey] = None,
+        limit: int = 1000
+    ) -> List[Trade]:
+        """
+        One page of trades from the local store. Only the first page syncs;
+        following pages continue from the key without calling the broker.
+        """
+        if after is None:
+            await self._prepare(broker_id, broker, start_time)
+        return await asyncio.to_thread(
+            self.store.query_page, broker_id, symbol, start_time, end_time, status, after, limit
+        )
+
+    async def stream_trades(
+        self,
+        broker_id: str,
+        broker: BrokerBase,
+        symbol: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[TradeStatus] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Trade]:
+        """Sync new activity, then stream matching trades from the local store in batches."""
+        await self._prepare(broker_id, broker, start_time)
+        after = None
+        while True:
+            batch = await asyncio.to_thread(
+                self.store.query_page, broker_id, symbol, start_time, end_time, status, after, batch_size
+            )
+            for trade in batch:
+                yield trade
+            if len(batch) < batch_size:
+                return
+            after = trade_key(batch[-1])
+
+    def _status(self, broker_id: str) -> Dict:
+        covered_from = self.store.get_coverage(broker_id)
+        return {
+            'broker_id': broker_id,
+            'stored_trades': self.store.count(broker_id),
+            'covered_from': datetime.fromtimestamp(covered_from).isoformat() if covered_from is not None else None,
+            'cursor': self.store.get_cursor(broker_id)
+        }
+
+    async def status(self, broker_id: str) -> Dict:
+        """Stored trade count, covered history and cursor of a broker."""
+        return await asyncio.to_thread(self._status, broker_id)
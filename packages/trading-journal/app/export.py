@@ -0,0 +1,141 @@
+"""
+Arrow IPC / Parquet export of the combined trade history
+
+Requires the optional ``pyarrow`` package. Read an export back with e.g.
+
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map("trades.arrow")).read_all()
+
+or ``pandas.read_parquet("trades.parquet")``.
+"""
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+from .models.trade import Trade
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+EXPORT_FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Columns with few distinct values are dictionary-encoded
+DICTIONARY_COLUMNS = ('broker_id', 'symbol', 'type', 'status')
+
+
+def trade_schema() -> "pa.Schema":
+    """Arrow schema of an exported trade table."""
+    _require_arrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.string()),
+        ('broker_id', category),
+        ('symbol', category),
+        ('type', category),
+        ('status', category),
+        ('quantity', pa.float64()),
+        ('entry_price', pa.float64()),
+        ('exit_price', pa.float64()),
+        ('entry_time', pa.timestamp('us')),
+        ('exit_time', pa.timestamp('us')),
+        ('stop_loss', pa.float64()),
+        ('take_profit', pa.float64()),
+        ('commission', pa.float64()),
+        ('swap', pa.float64()),
+        ('pnl', pa.float64()),
+        ('pnl_percent', pa.float64()),
+        ('notes', pa.string()),
+        ('tags', pa.list_(pa.string())),
+        ('metadata', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('updated_at', pa.timestamp('us')),
+    ])
+
+
+def _require_arrow() -> None:
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("Trade export needs pyarrow: pip install pyarrow")
+
+
+def _category(trade: Trade, name: str) -> str:
+    value = getattr(trade, name)
+    return value.value if name in ('type', 'status') else value
+
+
+def _categories(trade_lists: Iterable[List[Trade]]) -> Dict[str, Dict[str, int]]:
+    """Codes of every dictionary-column value, in order of first appearance."""
+    categories: Dict[str, Dict[str, int]] = {name: {} for name in DICTIONARY_COLUMNS}
+    for trades in trade_lists:
+        for name, codes in categories.items():
+            for trade in trades:
+                value = _category(trade, name)
+                if value not in codes:
+                    codes[value] = len(codes)
+    return categories
+
+
+def trades_to_batch(
+    trades: List[Trade],
+    schema: Optional["pa.Schema"] = None,
+    categories: Optional[Dict[str, Dict[str, int]]] = None
+) -> "pa.RecordBatch":
+    """
+    Convert trades to one typed Arrow record batch. Pass shared
+    ``categories`` so every batch of a file uses the same dictionaries.
+    """
+    schema = schema or trade_schema()
+    categories = categories or _categories([trades])
+    columns = []
+    for field in schema:
+        if field.name in DICTIONARY_COLUMNS:
+            codes = categories[field.name]
+            indices = pa.array([codes[_category(t, field.name)] for t in trades], type=pa.int32())
+            columns.append(pa.DictionaryArray.from_arrays(indices, pa.array(list(codes), type=pa.string())))
+        elif field.name == 'metadata':
+            columns.append(pa.array([json.dumps(t.metadata, default=str) for t in trades], type=field.type))
+        else:
+            columns.append(pa.array([getattr(t, field.name) for t in trades], type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _batches(broker_trades: Dict[str, List[Trade]], schema: "pa.Schema", batch_size: int) -> Iterator["pa.RecordBatch"]:
+    # Arrow IPC files allow one dictionary per column, shared by all batches
+    categories = _categories(broker_trades.values())
+    for trades in broker_trades.values():
+        for start in range(0, len(trades), batch_size):
+            yield trades_to_batch(trades[start:start + batch_size], schema, categories)
+
+
+def write_trades(
+    broker_trades: Dict[str, List[Trade]],
+    path: str,
+    fmt: str = 'arrow',
+    batch_size: int = 65536
+) -> int:
+    """
+    Write the trades of all brokers to ``path`` as an Arrow IPC file
+    (``fmt='arrow'``, memory-mappable) or a Parquet file. Trades are
+    converted ``batch_size`` at a time. Returns the number of rows written.
+    """
+    _require_arrow()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'")
+
+    schema = trade_schema()
+    rows = 0
+    if fmt == 'arrow':
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in _batches(broker_trades, schema, batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    else:
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in _batches(broker_trades, schema, batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
@@ -1,16 +1,34 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Dict
-from datetime import datetime
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
 import os
+import tempfile
+import pandas as pd
 from dotenv import load_dotenv
 
 from .models.trade import Trade, TradeStatus, TradeType
 from .brokers.binance import BinanceBroker
 from .brokers.mock import MockBroker
+from .brokers.fanout import fan_out, FanOutResult
+from .brokers.cache import SnapshotCache, CachedBroker
+from .brokers.sync import TradeStore, TradeSync
+from .brokers.poller import BrokerPoller
+from .brokers.singleflight import SingleFlight
+from .brokers.fx_rates import FxRates
 from .analytics.cross_broker import CrossBrokerAnalytics
+from .analytics.fx import required_currencies
+from .analytics.group_by import GROUP_KEYS
 from .analytics.risk_metrics import RiskMetrics
 from .mock_data import get_mock_data, reset_mock_data
+from .streaming import STREAM_MEDIA_TYPES, serialize_trades
+from .export import ARROW_AVAILABLE, EXPORT_FORMATS, write_trades
+from .pagination import decode_cursor, encode_cursor, trade_key
 
 # Optional MT4/MT5 imports (not available on Mac)
 try:
@@ -22,6 +40,8 @@ except ImportError:
 
 try:
     from .brokers.mt4 import MT4Broker
+    from .brokers.bridge_client import BridgeClient
+    from .brokers.mt4_files import MT4FileBroker
     MT4_AVAILABLE = True
 except ImportError:
     MT4_AVAILABLE = False
@@ -43,30 +63,73 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize broker connections
 brokers = {}
 
+# Process pool for Monte Carlo simulations and per-broker metrics of large
+# histories, started with the app (one worker runs everything in-process).
+# SIMULATION_WORKERS is the older name of ANALYTICS_WORKERS.
+analytics_workers = (
+    int(os.getenv('ANALYTICS_WORKERS', '0')) or int(os.getenv('SIMULATION_WORKERS', '0')) or os.cpu_count() or 1
+)
+analytics_pool = None
+
 # Initialize analytics engines
-analytics = CrossBrokerAnalytics()
+analytics = CrossBrokerAnalytics(
+    parallel_min_trades=int(os.getenv('ANALYTICS_PARALLEL_MIN_TRADES', '250000'))
+)
 risk_metrics = RiskMetrics()
 
 # Check if we should use mock data (default to True if no real brokers configured)
 use_mock_data = os.getenv('USE_MOCK_DATA', 'true').lower() == 'true'
 
+# Per-broker timeout (seconds) for dashboard fan-out requests
+broker_fetch_timeout = float(os.getenv('BROKER_FETCH_TIMEOUT', '10'))
+
+# Page size of /trades when a cursor is given without a limit
+trades_page_size = int(os.getenv('TRADES_PAGE_SIZE', '1000'))
+
+# Shared snapshot cache for broker trades, positions and balances
+snapshot_cache = SnapshotCache(
+    ttl=float(os.getenv('BROKER_CACHE_TTL', '30')),
+    max_entries=int(os.getenv('BROKER_CACHE_MAX_ENTRIES', '256'))
+)
+
+# Short-lived per-symbol cache for market data, shared by all brokers
+tick_cache = SnapshotCache(
+    ttl=float(os.getenv('MARKET_TICK_TTL', '2')),
+    max_entries=int(os.getenv('MARKET_TICK_MAX_ENTRIES', '1024'))
+)
+
+# Coalesces identical in-flight broker calls
+broker_flights = SingleFlight()
+
+# Incremental trade sync (enabled when TRADE_SYNC_DB points to a SQLite file)
+trade_sync_db = os.getenv('TRADE_SYNC_DB')
+trade_sync = TradeSync(
+    TradeStore(trade_sync_db),
+    history=timedelta(days=int(os.getenv('TRADE_SYNC_HISTORY_DAYS', '30')))
+) if trade_sync_db else None
+
+def wrap_broker(broker_id: str, broker) -> CachedBroker:
+    """Put the shared caches, call coalescing and trade sync in front of a broker."""
+    return CachedBroker(broker_id, broker, snapshot_cache, broker_flights, trade_sync, tick_cache)
+
 if use_mock_data:
     # Initialize mock brokers with dummy data
     print("🎭 Using mock data for testing...")
     mock_data = get_mock_data()
     
     for broker_id in ['binance', 'mt5', 'mt4']:
-        brokers[broker_id] = MockBroker(
+        brokers[broker_id] = wrap_broker(broker_id, MockBroker(
             broker_id=broker_id,
             trades=mock_data['trades'][broker_id],
             balance=mock_data['balances'][broker_id],
             positions=mock_data['positions'][broker_id]
-        )
+        ))
     print(f"✅ Initialized {len(brokers)} mock brokers with dummy data")
 else:
     # Initialize real brokers
@@ -74,7 +137,14 @@ else:
     binance_api_key = os.getenv('BINANCE_API_KEY')
     binance_api_secret = os.getenv('BINANCE_API_SECRET')
     if binance_api_key and binance_api_secret:
-        brokers['binance'] = BinanceBroker(binance_api_key, binance_api_secret)
+        binance_symbols = [s.strip() for s in os.getenv('BINANCE_SYMBOLS', '').split(',') if s.strip()]
+        brokers['binance'] = wrap_broker('binance', BinanceBroker(
+            binance_api_key,
+            binance_api_secret,
+            symbols=binance_symbols,
+            history_days=int(os.getenv('BINANCE_HISTORY_DAYS', '30')),
+            history_concurrency=int(os.getenv('BINANCE_HISTORY_CONCURRENCY', '5'))
+        ))
 
     # Initialize MT5 broker if credentials are available and MT5 is available
     if MT5_AVAILABLE:
@@ -82,7 +152,7 @@ else:
         mt5_password = os.getenv('MT5_PASSWORD')
         mt5_server = os.getenv('MT5_SERVER')
         if mt5_account and mt5_password and mt5_server:
-            brokers['mt5'] = MT5Broker(int(mt5_account), mt5_password, mt5_server)
+            brokers['mt5'] = wrap_broker('mt5', MT5Broker(int(mt5_account), mt5_password, mt5_server))
 
     # Initialize MT4 broker if credentials are available and MT4 is available
     if MT4_AVAILABLE:
@@ -90,42 +160,173 @@ else:
         mt4_account = os.getenv('MT4_ACCOUNT')
         mt4_password = os.getenv('MT4_PASSWORD')
         if mt4_api_url and mt4_account and mt4_password:
-            brokers['mt4'] = MT4Broker(mt4_api_url, int(mt4_account), mt4_password)
+            mt4_client = BridgeClient(
+                mt4_api_url,
+                max_connections=int(os.getenv('MT4_BRIDGE_MAX_CONNECTIONS', '10')),
+                timeout=float(os.getenv('MT4_BRIDGE_TIMEOUT', '10')),
+                retries=int(os.getenv('MT4_BRIDGE_RETRIES', '3'))
+            )
+            brokers['mt4'] = wrap_broker('mt4', MT4Broker(mt4_api_url, int(mt4_account), mt4_password, client=mt4_client))
+        elif os.getenv('MT4_HISTORY_FILE'):
+            # No bridge configured: read exported history and .hst files directly
+            brokers['mt4'] = wrap_broker('mt4', MT4FileBroker(
+                os.getenv('MT4_HISTORY_FILE'),
+                hst_dir=os.getenv('MT4_HST_DIR')
+            ))
+
+# Background poller that keeps an in-memory snapshot for the dashboards
+broker_poller = None
+poll_history_days = os.getenv('BROKER_POLL_HISTORY_DAYS')
+if os.getenv('BROKER_POLL_ENABLED', 'true').lower() == 'true':
+    broker_poller = BrokerPoller(
+        brokers,
+        intervals={
+            'trades': float(os.getenv('BROKER_POLL_TRADES_INTERVAL', '60')),
+            'positions': float(os.getenv('BROKER_POLL_POSITIONS_INTERVAL', '10')),
+            'balance': float(os.getenv('BROKER_POLL_BALANCE_INTERVAL', '30'))
+        },
+        jitter=float(os.getenv('BROKER_POLL_JITTER', '0.1')),
+        max_backoff=float(os.getenv('BROKER_POLL_MAX_BACKOFF', '300')),
+        history=timedelta(days=float(poll_history_days)) if poll_history_days else None
+    )
+
+# Base-currency rate table for consolidated balances, positions and PnL
+fx_rates = FxRates(
+    brokers,
+    base=os.getenv('FX_BASE_CURRENCY', 'USD'),
+    ttl=float(os.getenv('FX_RATE_TTL', '300')),
+    rate_file=os.getenv('FX_RATE_FILE'),
+    bridges=[c.strip() for c in os.getenv('FX_BRIDGE_CURRENCIES', 'USDT').split(',') if c.strip()],
+    pegs=dict(
+        tuple(c.strip() for c in peg.split(':', 1))
+        for peg in os.getenv('FX_PEGS', 'USDT:USD,USDC:USD').split(',') if ':' in peg
+    )
+)
+
+# Optional JSON file the poller's online risk metrics are saved to on shutdown
+live_metrics_checkpoint = os.getenv('LIVE_METRICS_CHECKPOINT')
+
+# Cap on paths x trades of one Monte Carlo simulation
+simulation_max_cells = int(os.getenv('SIMULATION_MAX_CELLS', str(1 << 28)))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize broker connections on startup."""
+    global analytics_pool
+    if analytics_workers > 1:
+        analytics_pool = ProcessPoolExecutor(max_workers=analytics_workers)
+        analytics.executor = analytics_pool
     for broker in brokers.values():
         await broker.connect()
+    if broker_poller:
+        if live_metrics_checkpoint and os.path.exists(live_metrics_checkpoint):
+            try:
+                with open(live_metrics_checkpoint) as f:
+                    broker_poller.restore(json.load(f))
+            except Exception as e:
+                print(f"Error loading live metrics checkpoint: {e}")
+        broker_poller.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close broker connections on shutdown."""
+    if broker_poller:
+        await broker_poller.stop()
+        if live_metrics_checkpoint:
+            try:
+                with open(live_metrics_checkpoint, 'w') as f:
+                    json.dump(broker_poller.checkpoint(), f)
+            except Exception as e:
+                print(f"Error saving live metrics checkpoint: {e}")
+    if analytics_pool:
+        analytics.executor = None
+        analytics_pool.shutdown(cancel_futures=True)
     for broker in brokers.values():
         await broker.disconnect()
 
 @app.get("/trades", response_model=List[Trade])
 async def get_trades(
+    response: Response,
     broker: str,
     symbol: Optional[str] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    status: Optional[TradeStatus] = None
+    status: Optional[TradeStatus] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=10000)
 ):
-    """Get trades from a specific broker."""
+    """
+    Get trades from a specific broker.
+
+    Pass ``limit`` (and then the returned ``X-Next-Cursor`` header as
+    ``cursor``) to page through trades ordered by (entry_time, id). Pages
+    continue from the last key seen, so deep pages cost the same as the
+    first. The header is absent on the last page.
+    """
     if broker not in brokers:
         raise HTTPException(status_code=404, detail=f"Broker '{broker}' not found or not configured")
-    
+
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        return await brokers[broker].get_trades(
+        if after is None and limit is None:
+            return await brokers[broker].get_trades(
+                symbol=symbol,
+                start_time=start_time,
+                end_time=end_time,
+                status=status
+            )
+
+        limit = limit or trades_page_size
+        # One extra trade tells whether there is a next page
+        page = await brokers[broker].get_trades_page(
             symbol=symbol,
             start_time=start_time,
             end_time=end_time,
-            status=status
+            status=status,
+            after=after,
+            limit=limit + 1
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers['X-Next-Cursor'] = encode_cursor(trade_key(page[-1]))
+    return page
+
+@app.get("/trades/stream")
+async def stream_trades(
+    broker: str,
+    symbol: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    status: Optional[TradeStatus] = None,
+    fmt: str = Query("ndjson", alias="format")
+):
+    """
+    Stream trades from a specific broker as NDJSON (default) or a chunked
+    JSON array (format=json). Trades are serialized as they are read, so
+    large histories never sit in memory as one response.
+    """
+    if broker not in brokers:
+        raise HTTPException(status_code=404, detail=f"Broker '{broker}' not found or not configured")
+    if fmt not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}', use one of: {', '.join(STREAM_MEDIA_TYPES)}")
+    
+    trades = brokers[broker].stream_trades(
+        symbol=symbol,
+        start_time=start_time,
+        end_time=end_time,
+        status=status
+    )
+    return StreamingResponse(serialize_trades(trades, fmt), media_type=STREAM_MEDIA_TYPES[fmt])
+
 @app.get("/balance")
 async def get_balance(broker: str):
     """Get account balance from a specific broker."""
@@ -148,6 +349,49 @@ async def get_positions(broker: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/market")
+async def get_market_data_batch(symbols: str, broker_ids: Optional[str] = Query(None, alias="brokers")):
+    """
+    Get market data for many symbols from several brokers at once.
+
+    ``symbols`` and ``brokers`` are comma-separated; all brokers are queried
+    when ``brokers`` is omitted. Fresh ticks come from the tick cache and
+    the rest are fetched with one batch call per broker.
+    """
+    symbol_list = [s.strip() for s in symbols.split(',') if s.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols given")
+
+    selected = [b.strip() for b in broker_ids.split(',') if b.strip()] if broker_ids else list(brokers)
+    unknown = [b for b in selected if b not in brokers]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Broker(s) not found or not configured: {', '.join(unknown)}")
+
+    market = {}
+    errors = {}
+
+    async def run(broker_id: str) -> None:
+        try:
+            market[broker_id] = await asyncio.wait_for(
+                brokers[broker_id].get_market_data_batch(symbol_list),
+                timeout=broker_fetch_timeout
+            )
+        except asyncio.TimeoutError:
+            errors[broker_id] = f"timed out after {broker_fetch_timeout}s"
+            print(f"Error fetching market data from {broker_id}: timed out after {broker_fetch_timeout}s")
+        except Exception as e:
+            errors[broker_id] = str(e)
+            print(f"Error fetching market data from {broker_id}: {e}")
+
+    await asyncio.gather(*(run(broker_id) for broker_id in selected))
+
+    return {
+        'symbols': symbol_list,
+        'market': market,
+        'failed': errors,
+        'timestamp': datetime.now()
+    }
+
 @app.get("/market/{symbol}")
 async def get_market_data(broker: str, symbol: str):
     """Get market data for a symbol from a specific broker."""
@@ -161,6 +405,25 @@ async def get_market_data(broker: str, symbol: str):
 
 # ============= DASHBOARD ENDPOINTS =============
 
+async def load_broker_data(
+    include,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> FanOutResult:
+    """
+    Serve dashboard data from the poller snapshot, or fetch it from the
+    brokers while no fresh snapshot exists or it starts after start_time.
+    """
+    if broker_poller and broker_poller.ready(include, start_time):
+        return broker_poller.read(include, start_time, end_time)
+    return await fan_out(
+        brokers,
+        include=include,
+        start_time=start_time,
+        end_time=end_time,
+        timeout=broker_fetch_timeout
+    )
+
 @app.get("/dashboard/consolidated")
 async def get_consolidated_dashboard(
     start_time: Optional[datetime] = None,
@@ -171,37 +434,25 @@ async def get_consolidated_dashboard(
     Returns: Total PnL, risk metrics, open positions, and performance stats.
     """
     try:
-        # Fetch data from all brokers
-        broker_trades: Dict[str, List[Trade]] = {}
-        broker_positions: Dict[str, List[Dict]] = {}
-        broker_balances: Dict[str, Dict] = {}
+        # Fetch data from all brokers (snapshot or live, concurrently)
+        fetch = await load_broker_data(('trades', 'positions', 'balance'), start_time, end_time)
         
-        for broker_id, broker in brokers.items():
-            try:
-                trades = await broker.get_trades(
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                positions = await broker.get_positions()
-                balance = await broker.get_balance()
-                
-                broker_trades[broker_id] = trades
-                broker_positions[broker_id] = positions
-                broker_balances[broker_id] = balance
-            except Exception as e:
-                print(f"Error fetching data from {broker_id}: {e}")
-                continue
+        # Convert everything to the base currency, one rate per currency
+        frame = fetch.frame()
+        rates = await fx_rates.table(required_currencies(frame, fetch.positions, fetch.balances))
         
         # Calculate consolidated stats
         consolidated_stats = analytics.calculate_consolidated_stats(
-            broker_trades,
-            broker_positions,
-            broker_balances
+            frame,
+            fetch.positions,
+            fetch.balances,
+            rates
         )
         
         # Add broker list
         consolidated_stats['active_brokers'] = list(brokers.keys())
         consolidated_stats['broker_count'] = len(brokers)
+        consolidated_stats['fetch'] = fetch.report()
         
         return consolidated_stats
         
@@ -218,30 +469,23 @@ async def get_broker_comparison(
     Returns: Per-broker stats including PnL, win rate, Sharpe ratio, etc.
     """
     try:
-        broker_trades: Dict[str, List[Trade]] = {}
-        broker_balances: Dict[str, Dict] = {}
+        fetch = await load_broker_data(('trades', 'balance'), start_time, end_time)
         
-        for broker_id, broker in brokers.items():
-            try:
-                trades = await broker.get_trades(
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                balance = await broker.get_balance()
-                
-                broker_trades[broker_id] = trades
-                broker_balances[broker_id] = balance
-            except Exception as e:
-                print(f"Error fetching data from {broker_id}: {e}")
-                continue
+        frame = fetch.frame()
+        rates = await fx_rates.table(required_currencies(frame, {}, fetch.balances))
         
-        comparison = analytics.compare_broker_performance(
-            broker_trades,
-            broker_balances
+        # Off the event loop: large histories take a while, even in parallel
+        comparison = await asyncio.to_thread(
+            analytics.compare_broker_performance,
+            frame,
+            fetch.balances,
+            rates
         )
         
         return {
             "brokers": comparison,
+            "base_currency": rates.base,
+            "fetch": fetch.report(),
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -252,33 +496,67 @@ async def get_broker_comparison(
 async def get_performance_timeline(
     period: str = "daily",
     start_time: Optional[datetime] = None,
-    end_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None,
+    broker: Optional[str] = None,
+    symbol: Optional[str] = None
 ):
     """
-    Get performance timeline aggregated by period (daily, weekly, monthly).
+    Get performance timeline aggregated by period (daily, weekly, monthly),
+    optionally for one broker and/or symbol.
     Returns: Time series of PnL across all brokers.
     """
     try:
-        broker_trades: Dict[str, List[Trade]] = {}
+        fetch = await load_broker_data(('trades',), start_time, end_time)
         
-        for broker_id, broker in brokers.items():
-            try:
-                trades = await broker.get_trades(
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                broker_trades[broker_id] = trades
-            except Exception as e:
-                print(f"Error fetching data from {broker_id}: {e}")
-                continue
-        
-        timeline = analytics.get_performance_timeline(broker_trades, period)
+        if fetch.source == 'snapshot' and start_time is None and end_time is None:
+            # Read the PnL buckets the poller keeps up to date, not the trades
+            timeline = analytics.get_performance_timeline(fetch.trades, period, broker_poller.rollups(), broker, symbol)
+        else:
+            timeline = analytics.get_performance_timeline(fetch.frame(), period, broker_id=broker, symbol=symbol)
+        timeline['fetch'] = fetch.report()
         
         return timeline
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_window(value: Optional[str]):
+    """A trade count ("50") or a pandas-style duration ("30D", "12h")."""
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return pd.Timedelta(value).to_pytimedelta()
+
+@app.get("/dashboard/rolling-metrics")
+async def get_rolling_metrics(
+    window: str = "50",
+    step: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Rolling PnL, win rate, Sharpe ratio and max drawdown across all brokers.
+    ``window``/``step`` are trade counts (window=50&step=5) or durations
+    (window=30D&step=7D); both must be of the same kind.
+    Returns: One value per window, labelled by the window's end time.
+    """
+    try:
+        rolling_window, rolling_step = parse_window(window), parse_window(step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid window or step: {e}")
+    
+    try:
+        fetch = await load_broker_data(('trades',), start_time, end_time)
+        rolling = analytics.get_rolling_metrics(fetch.frame(), rolling_window, rolling_step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    rolling['fetch'] = fetch.report()
+    return rolling
+
 @app.get("/dashboard/symbol-performance")
 async def get_symbol_performance(
     start_time: Optional[datetime] = None,
@@ -289,23 +567,43 @@ async def get_symbol_performance(
     Returns: Per-symbol stats including PnL, win rate, trade count.
     """
     try:
-        broker_trades: Dict[str, List[Trade]] = {}
-        
-        for broker_id, broker in brokers.items():
-            try:
-                trades = await broker.get_trades(
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                broker_trades[broker_id] = trades
-            except Exception as e:
-                print(f"Error fetching data from {broker_id}: {e}")
-                continue
+        fetch = await load_broker_data(('trades',), start_time, end_time)
         
-        symbol_stats = analytics.get_symbol_performance(broker_trades)
+        symbol_stats = analytics.get_symbol_performance(fetch.frame())
         
         return {
             "symbols": symbol_stats,
+            "fetch": fetch.report(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/dashboard/breakdown")
+async def get_breakdown(
+    by: str = "symbol",
+    risk: bool = False,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Performance grouped by symbol, broker, tag, weekday or hour (``by``)
+    across all brokers; ``risk=true`` adds Sharpe ratio and max drawdown.
+    Returns: Per-group PnL, trade count, win rate, profit factor, avg win/loss.
+    """
+    if by not in GROUP_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid group key '{by}', use one of: {', '.join(GROUP_KEYS)}")
+    
+    try:
+        fetch = await load_broker_data(('trades',), start_time, end_time)
+        
+        groups = analytics.get_breakdown(fetch.frame(), by, risk)
+        
+        return {
+            "by": by,
+            "groups": groups,
+            "fetch": fetch.report(),
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -322,51 +620,155 @@ async def get_risk_metrics(
     Returns: Max drawdown, VaR, Sharpe ratio, expectancy, etc.
     """
     try:
-        broker_trades: Dict[str, List[Trade]] = {}
-        broker_positions: Dict[str, List[Dict]] = {}
+        fetch = await load_broker_data(('trades', 'positions'), start_time, end_time)
         
-        for broker_id, broker in brokers.items():
-            try:
-                trades = await broker.get_trades(
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                positions = await broker.get_positions()
-                
-                broker_trades[broker_id] = trades
-                broker_positions[broker_id] = positions
-            except Exception as e:
-                print(f"Error fetching data from {broker_id}: {e}")
-                continue
-        
-        # Aggregate all trades
-        all_trades = analytics.aggregate_trades(broker_trades)
+        # All trades as one columnar frame
+        all_trades = fetch.frame()
         all_positions = []
-        for positions in broker_positions.values():
+        for positions in fetch.positions.values():
             all_positions.extend(positions)
         
-        # Calculate risk metrics
-        max_dd = risk_metrics.calculate_max_drawdown(all_trades)
-        win_rate_stats = risk_metrics.calculate_win_rate(all_trades)
-        sharpe = risk_metrics.calculate_sharpe_ratio(all_trades)
-        expectancy = risk_metrics.calculate_expectancy(all_trades)
-        var_95 = risk_metrics.calculate_var(all_trades, 0.95)
-        var_99 = risk_metrics.calculate_var(all_trades, 0.99)
+        # Calculate risk metrics in one pass (same kernel as the consolidated dashboard)
+        metrics = risk_metrics.calculate_trade_metrics(all_trades, var_levels=(0.95, 0.99))
         open_risk = risk_metrics.calculate_open_risk(all_positions)
         
         return {
-            "max_drawdown": max_dd,
-            "win_rate_stats": win_rate_stats,
-            "sharpe_ratio": sharpe,
-            "expectancy": expectancy,
-            "var_95": var_95,
-            "var_99": var_99,
+            "max_drawdown": metrics['max_drawdown'],
+            "win_rate_stats": metrics['win_rate_stats'],
+            "sharpe_ratio": metrics['sharpe_ratio'],
+            "expectancy": metrics['expectancy'],
+            "var_95": metrics['var_95'],
+            "var_99": metrics['var_99'],
             "open_risk": open_risk,
+            "fetch": fetch.report(),
             "timestamp": datetime.utcnow().isoformat()
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/dashboard/monte-carlo")
+async def get_monte_carlo(
+    paths: int = Query(10000, ge=1, le=1000000),
+    horizon: Optional[int] = Query(None, ge=1),
+    block_size: int = Query(1, ge=1),
+    seed: Optional[int] = Query(None, ge=0),
+    capital: Optional[float] = Query(None, gt=0),
+    ruin_fraction: float = Query(0.5, gt=0, le=1),
+    broker: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Bootstrap ``paths`` equity paths of ``horizon`` trades (default: the
+    closed-trade count) from the realized PnL of all brokers, or of one.
+    ``block_size`` > 1 resamples runs of consecutive trades (capped at the
+    horizon). Pass ``seed`` to reproduce a run, and ``capital`` for the
+    risk of ruin.
+    Returns: Final PnL and max drawdown distributions, VaR/CVaR, risk of ruin.
+    """
+    try:
+        fetch = await load_broker_data(('trades',), start_time, end_time)
+        frame = fetch.frame()
+        if broker is not None:
+            frame = frame.for_broker(broker)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if paths * (horizon or int(frame.closed.sum())) > simulation_max_cells:
+        raise HTTPException(
+            status_code=400,
+            detail=f"paths x horizon exceeds {simulation_max_cells} simulated trades, lower paths or horizon"
+        )
+    
+    try:
+        simulation = await asyncio.to_thread(
+            risk_metrics.calculate_monte_carlo, frame,
+            paths=paths, horizon=horizon, block_size=block_size, seed=seed,
+            capital=capital, ruin_fraction=ruin_fraction, executor=analytics_pool
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    simulation['fetch'] = fetch.report()
+    return simulation
+
+@app.get("/dashboard/live-metrics")
+async def get_live_metrics():
+    """
+    Per-broker risk metrics maintained incrementally by the background
+    poller: each refresh only adds newly closed trades, so the cost does not
+    grow with history. Same fields as /dashboard/risk-metrics (without open
+    risk); VaR is a streaming estimate on long histories.
+    """
+    if not broker_poller:
+        raise HTTPException(status_code=400, detail="Live metrics need the background poller. Set BROKER_POLL_ENABLED=true")
+    
+    return {
+        "brokers": broker_poller.online_metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/dashboard/drawdown")
+async def get_drawdown(
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Get the maximum drawdown across all brokers with its peak, trough and
+    recovery, plus the underwater curve (equity below its running peak
+    after each closed trade) for charting.
+    """
+    try:
+        fetch = await load_broker_data(('trades',), start_time, end_time)
+        profile = risk_metrics.calculate_drawdown_profile(fetch.frame())
+        
+        return {
+            **profile,
+            "fetch": fetch.report(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/trades")
+async def export_trades(
+    fmt: str = Query("arrow", alias="format"),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """
+    Download the combined trades of all brokers as an Arrow IPC file
+    (format=arrow, memory-mappable) or Parquet (format=parquet), with typed
+    columns and dictionary-encoded symbols.
+    """
+    if not ARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Trade export needs pyarrow: pip install pyarrow")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}', use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    media_type, extension = EXPORT_FORMATS[fmt]
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    os.close(fd)
+    try:
+        fetch = await load_broker_data(('trades',), start_time, end_time)
+        rows = await asyncio.to_thread(write_trades, fetch.trades, path, fmt)
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {'X-Trade-Count': str(rows)}
+    if fetch.errors:
+        headers['X-Failed-Brokers'] = ','.join(fetch.errors)
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=f"trades.{extension}",
+        headers=headers,
+        background=BackgroundTask(os.remove, path)
+    )
+
 @app.get("/brokers")
 async def list_brokers():
     """List all configured brokers and their connection status."""
@@ -376,11 +778,46 @@ async def list_brokers():
         broker_info.append({
             'broker_id': broker_id,
             'connected': True,  # Assume connected if in dict
-            'type': broker.__class__.__name__
+            'type': broker.wrapped.__class__.__name__
         })
     
     return {'brokers': broker_info}
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the broker snapshot cache and call coalescing."""
+    stats = snapshot_cache.stats()
+    stats['ticks'] = tick_cache.stats()
+    stats['single_flight'] = broker_flights.stats()
+    stats['fx'] = fx_rates.stats()
+    return stats
+
+@app.get("/bridge/stats")
+async def get_bridge_stats():
+    """Per-endpoint latency and retry stats for REST bridge brokers (MT4)."""
+    return {
+        broker_id: broker.wrapped.client.stats()
+        for broker_id, broker in brokers.items()
+        if hasattr(broker.wrapped, 'client')
+    }
+
+@app.get("/poller/status")
+async def get_poller_status():
+    """Age and last error of each broker dataset in the background snapshot."""
+    if not broker_poller:
+        return {'enabled': False, 'brokers': {}}
+    return {'enabled': True, 'ready': broker_poller.ready(), 'brokers': broker_poller.status()}
+
+@app.get("/sync/status")
+async def get_sync_status():
+    """Stored trade counts and sync cursors per broker."""
+    if not trade_sync:
+        return {'enabled': False, 'brokers': []}
+    return {
+        'enabled': True,
+        'brokers': [await trade_sync.status(broker_id) for broker_id in brokers]
+    }
+
 @app.post("/mock/reset")
 async def reset_mock():
     """Reset mock data with new random trades (only works if USE_MOCK_DATA=true)"""
@@ -390,17 +827,25 @@ async def reset_mock():
     try:
         # Generate new mock data
         new_mock_data = reset_mock_data()
+        snapshot_cache.clear()
+        tick_cache.clear()
+        fx_rates.clear()
+        if trade_sync:
+            trade_sync.store.clear()
         
         # Update brokers with new data
         for broker_id in ['binance', 'mt5', 'mt4']:
-            brokers[broker_id] = MockBroker(
+            brokers[broker_id] = wrap_broker(broker_id, MockBroker(
                 broker_id=broker_id,
                 trades=new_mock_data['trades'][broker_id],
                 balance=new_mock_data['balances'][broker_id],
                 positions=new_mock_data['positions'][broker_id]
-            )
+            ))
             await brokers[broker_id].connect()
         
+        if broker_poller:
+            await broker_poller.refresh()
+        
         return {
             'status': 'success',
             'message': 'Mock data has been reset with new random trades',
@@ -15,7 +15,7 @@ class MockDataGenerator:
     @staticmethod
     def generate_trades(broker_id: str, num_trades: int = 50) -> List[Trade]:
         """Generate random trades for a broker"""
-        trades = []
+        rows = []
         base_date = datetime.now() - timedelta(days=90)
         
         for i in range(num_trades):
@@ -54,8 +54,8 @@ class MockDataGenerator:
                 exit_price = None
                 status = TradeStatus.OPEN
             
-            # Create trade
-            trade = Trade(
+            # Trade fields, built into Trade objects in one batch below
+            rows.append(dict(
                 id=f"{broker_id}_{i+1}_{int(entry_time.timestamp())}",
                 broker_id=broker_id,
                 symbol=symbol,
@@ -69,13 +69,14 @@ class MockDataGenerator:
                 commission=random.uniform(0.5, 5.0),
                 swap=random.uniform(-2.0, 2.0) if is_closed else 0.0,
                 notes=f"Mock trade #{i+1} for {broker_id}"
-            )
-            
-            # Calculate PnL for closed trades
-            if is_closed:
+            ))
+        
+        trades = Trade.trusted_batch(rows)
+        
+        # Calculate PnL for closed trades
+        for trade in trades:
+            if trade.status == TradeStatus.CLOSED:
                 trade.pnl, trade.pnl_percent = trade.calculate_pnl()
-            
-            trades.append(trade)
         
         return trades
     
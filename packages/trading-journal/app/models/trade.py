@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 
 class TradeType(str, Enum):
     BUY = "buy"
@@ -35,6 +35,42 @@ class Trade(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    @classmethod
+    def trusted(cls, **data: Any) -> "Trade":
+        """
+        Build a Trade without validation, for data a broker adapter has
+        already typed itself (enums, floats, datetimes). Anything coming
+        from API clients must use the normal constructor.
+        """
+        return cls.trusted_batch([data])[0]
+
+    @classmethod
+    def trusted_batch(cls, rows: Iterable[Dict[str, Any]]) -> List["Trade"]:
+        """
+        Build many Trades without validation; see ``trusted``. All trades
+        in a batch share the same created_at/updated_at.
+        """
+        now = datetime.utcnow()
+        # model_construct resolves every missing default per call (and
+        # inspects default factories each time), so all fields are passed
+        template = {}
+        factories = []
+        for name, field in cls.model_fields.items():
+            if name in ('created_at', 'updated_at'):
+                template[name] = now
+            elif field.default_factory is not None:
+                factories.append((name, field.default_factory))
+            else:
+                template[name] = field.default
+
+        trades = []
+        for row in rows:
+            values = dict(template)
+            values.update((name, factory()) for name, factory in factories if name not in row)
+            values.update(row)
+            trades.append(cls.model_construct(set(row), **values))
+        return trades
+
     def calculate_pnl(self) -> tuple[float, float]:
         """Calculate profit/loss and percentage return."""
         if self.exit_price is None or self.entry_price is None:
@@ -0,0 +1,31 @@
+"""
+Opaque keyset cursors for paging trades by (entry_time, id)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from .models.trade import Trade
+
+TradeKey = Tuple[datetime, str]
+
+
+def trade_key(trade: Trade) -> TradeKey:
+    """Sort key that pages are ordered and split on."""
+    return (trade.entry_time, trade.id)
+
+
+def encode_cursor(key: TradeKey) -> str:
+    """Opaque next-page token for the last trade of a page."""
+    raw = json.dumps([key[0].isoformat(), key[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> TradeKey:
+    """Inverse of encode_cursor. Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        entry_time, trade_id = json.loads(raw)
+        return datetime.fromisoformat(entry_time), str(trade_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
@@ -0,0 +1,50 @@
+"""
+Incremental serialization of trade streams for HTTP responses
+"""
+from typing import AsyncIterator, List
+from .models.trade import Trade
+
+STREAM_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def _join(chunk: List[str], fmt: str, first: bool) -> str:
+    if fmt == 'ndjson':
+        return '\n'.join(chunk) + '\n'
+    body = ','.join(chunk)
+    return body if first else ',' + body
+
+
+async def serialize_trades(
+    trades: AsyncIterator[Trade],
+    fmt: str = 'ndjson',
+    chunk_size: int = 500
+) -> AsyncIterator[str]:
+    """
+    Serialize trades as they arrive, either as NDJSON (one trade per line)
+    or as a JSON array. Up to ``chunk_size`` trades are sent per chunk, so
+    only one chunk is held in memory at a time.
+    """
+    chunk: List[str] = []
+    first = True
+
+    if fmt == 'json':
+        yield '['
+    try:
+        async for trade in trades:
+            chunk.append(trade.model_dump_json())
+            if len(chunk) >= chunk_size:
+                yield _join(chunk, fmt, first)
+                chunk = []
+                first = False
+    except Exception as e:
+        # Headers are already sent; end the stream early, leaving a JSON
+        # array unterminated so clients can tell it is incomplete
+        print(f"Error streaming trades: {e}")
+        return
+    if chunk:
+        yield _join(chunk, fmt, first)
+    if fmt == 'json':
+        yield ']'
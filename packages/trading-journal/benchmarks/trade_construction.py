@@ -0,0 +1,90 @@
+"""
+Benchmark: validated vs trusted (model_construct) Trade construction for
+broker history pulls.
+
+Run from packages/trading-journal:
+
+    python -m benchmarks.trade_construction --count 200000
+"""
+import argparse
+import gc
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.brokers.mt4 import parse_trades, trade_fields
+from app.models.trade import Trade
+
+
+def make_records(count: int, seed: int = 42) -> list:
+    """MT4 bridge-style trade records."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    records = []
+    for ticket in range(count):
+        open_time = start + timedelta(minutes=rng.randint(0, 500000))
+        closed = rng.random() < 0.9
+        open_price = rng.uniform(1.0, 2.0)
+        records.append({
+            'ticket': ticket,
+            'type': rng.choice(('buy', 'sell')),
+            'symbol': rng.choice(('EURUSD', 'GBPUSD', 'XAUUSD', 'USDJPY')),
+            'volume': rng.choice((0.01, 0.1, 1.0)),
+            'open_price': open_price,
+            'close_price': open_price * rng.uniform(0.99, 1.01) if closed else 0,
+            'open_time': open_time.timestamp(),
+            'close_time': (open_time + timedelta(hours=rng.randint(1, 72))).timestamp() if closed else 0,
+            'commission': -rng.uniform(0, 5),
+            'swap': rng.uniform(-1, 1),
+            'profit': rng.uniform(-100, 100),
+            'magic': 0,
+            'comment': '',
+        })
+    return records
+
+
+def validated(records: list) -> list:
+    """The previous path: full pydantic validation, one trade at a time."""
+    trades = []
+    for record in records:
+        trade = Trade(**trade_fields(record))
+        if trade.exit_price:
+            trade.pnl, trade.pnl_percent = trade.calculate_pnl()
+        trades.append(trade)
+    return trades
+
+
+def timed(fn, records: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn(records)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+
+    # Both paths must produce the same trades
+    sample = records[:1000]
+    exclude = {'created_at', 'updated_at'}
+    assert [t.model_dump(exclude=exclude) for t in validated(sample)] == \
+        [t.model_dump(exclude=exclude) for t in parse_trades(sample)]
+
+    slow = timed(validated, records, args.repeat)
+    fast = timed(parse_trades, records, args.repeat)
+    print(f"{args.count} trades (best of {args.repeat})")
+    print(f"  validated:                 {slow:.3f}s ({slow / args.count * 1e6:.2f} us/trade)")
+    print(f"  trusted (model_construct): {fast:.3f}s ({fast / args.count * 1e6:.2f} us/trade)")
+    print(f"  speedup:                   {slow / fast:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
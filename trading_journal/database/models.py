@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from sqlalchemy import (
     Column, String, Float, DateTime, ForeignKey, 
-    Integer, JSON, Enum, Boolean, create_engine
+    Integer, JSON, Enum, Boolean, Index, create_engine
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -42,6 +42,10 @@ class Broker(Base):
 class Trade(Base):
     """Trade model to store individual trades."""
     __tablename__ = "trades"
+    __table_args__ = (
+        # Keyset pagination of trade listings
+        Index("ix_trades_timestamp_id", "timestamp", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     broker_id = Column(String, ForeignKey("brokers.id"), nullable=False)
@@ -1,12 +1,14 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from typing import List, Optional
+from sqlalchemy import and_, or_
 import uvicorn
 
 from .database import get_db
 from .models.trade import Trade, TradeUpdate, TradeType, TradeStatus
-from .database.models import Broker as DBBroker, Portfolio as DBPortfolio, Session
+from .database.models import Broker as DBBroker, Portfolio as DBPortfolio, Trade as DBTrade, Session
+from .pagination import decode_cursor, encode_cursor
 
 app = FastAPI(
     title="Multi-Broker Trading Journal API",
@@ -21,6 +23,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # OAuth2 scheme for token authentication
@@ -44,14 +47,23 @@ async def create_trade(trade: Trade, db: Session = Depends(get_db)):
 
 @app.get("/trades/", response_model=List[Trade])
 async def list_trades(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
     symbol: Optional[str] = None,
     trade_type: Optional[TradeType] = None,
     status: Optional[TradeStatus] = None,
     db: Session = Depends(get_db)
 ):
-    """List all trades with optional filtering."""
+    """
+    List trades ordered by (timestamp, id) with optional filtering.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to get
+    the next page; the header is absent on the last page. Pages seek on
+    the (timestamp, id) index, so deep pages cost the same as the first.
+    ``skip`` (OFFSET paging) is kept for old clients.
+    """
     query = db.query(DBTrade)
     
     if symbol:
@@ -60,8 +72,25 @@ async def list_trades(
         query = query.filter(DBTrade.trade_type == trade_type)
     if status:
         query = query.filter(DBTrade.status == status)
-        
-    return query.offset(skip).limit(limit).all()
+
+    if cursor is not None:
+        try:
+            timestamp, trade_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(or_(
+            DBTrade.timestamp > timestamp,
+            and_(DBTrade.timestamp == timestamp, DBTrade.id > trade_id)
+        ))
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether there is a next page
+    trades = query.order_by(DBTrade.timestamp, DBTrade.id).limit(limit + 1).all()
+    if len(trades) > limit:
+        trades = trades[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor((trades[-1].timestamp, trades[-1].id))
+    return trades
 
 @app.get("/trades/{trade_id}", response_model=Trade)
 async def get_trade(trade_id: str, db: Session = Depends(get_db)):
@@ -0,0 +1,25 @@
+"""
+Opaque keyset cursors for paging trades by (timestamp, id)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+TradeKey = Tuple[datetime, str]
+
+
+def encode_cursor(key: TradeKey) -> str:
+    """Opaque next-page token for the last trade of a page."""
+    raw = json.dumps([key[0].isoformat(), key[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> TradeKey:
+    """Inverse of encode_cursor. Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, trade_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(trade_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e